@@ -23,7 +23,14 @@ RenderDoc Android 远程回放分析脚本
 import sys
 import os
 import argparse
-from collections import defaultdict
+import functools
+import heapq
+import queue
+import re
+import threading
+import time
+from array import array
+from collections import defaultdict, namedtuple
 
 # 自动添加 RenderDoc Python 模块路径
 RENDERDOC_MODULE_PATHS = [
@@ -42,6 +49,62 @@ import renderdoc as rd
 DEFAULT_HOST = "localhost"  # 通过 ADB 端口转发时使用 localhost
 DEFAULT_PORT = 38920        # RenderDoc 默认端口
 
+# 预取线程最多领先主线程的事件数
+PREFETCH_QUEUE_SIZE = 8
+# 预取线程队列满时等待的间隔（秒），超时后检查是否已被要求停止
+PREFETCH_PUT_TIMEOUT = 0.1
+
+# 进度输出的最小刷新间隔（秒）
+PROGRESS_INTERVAL = 0.25
+
+# 语义名拆分为 (基名, 末尾数字索引)，例如 TEXCOORD1 -> ("TEXCOORD", "1")
+_SEMANTIC_RE = re.compile(r'^(.*?)(\d*)$')
+
+# 遍历热路径中用到的枚举值，模块加载时绑定一次
+_DRAW_FLAG = int(rd.ActionFlags.Drawcall)
+_DISPATCH_FLAG = int(rd.ActionFlags.Dispatch)
+_NULL_ID = rd.ResourceId.Null()
+_STAGES_DRAW = (rd.ShaderStage.Vertex, rd.ShaderStage.Pixel,
+                rd.ShaderStage.Geometry, rd.ShaderStage.Hull, rd.ShaderStage.Domain)
+_STAGES_DISPATCH = (rd.ShaderStage.Compute,)
+_STAGE_NAMES = {
+    int(rd.ShaderStage.Vertex): "VS",
+    int(rd.ShaderStage.Hull): "HS",
+    int(rd.ShaderStage.Domain): "DS",
+    int(rd.ShaderStage.Geometry): "GS",
+    int(rd.ShaderStage.Pixel): "PS",
+    int(rd.ShaderStage.Compute): "CS",
+}
+
+
+# 未被 VS 使用的顶点属性：属性名 / 语义键 / 每顶点字节数
+WastedAttr = namedtuple('WastedAttr', 'name key size')
+
+# 单个 Draw 的顶点属性浪费详情（报告阶段只为 Top-N 物化）
+WasteDetail = namedtuple(
+    'WasteDetail',
+    'eid num_vertices shader_needs wasted wasted_bytes_per_vertex total_wasted_bytes'
+)
+
+
+class SemanticStat:
+    """单个顶点语义的提供 / 使用 / 浪费次数"""
+    __slots__ = ('provided', 'used', 'wasted')
+    
+    def __init__(self):
+        self.provided = 0
+        self.used = 0
+        self.wasted = 0
+
+
+class BindingStat:
+    """单类资源绑定的总数 / 未使用数"""
+    __slots__ = ('total', 'unused')
+    
+    def __init__(self):
+        self.total = 0
+        self.unused = 0
+
 
 def format_size(size_bytes):
     """格式化字节大小"""
@@ -56,31 +119,19 @@ def format_size(size_bytes):
 
 
 def get_format_byte_size(fmt):
-    """估算格式的字节大小"""
-    fmt_str = str(fmt).lower()
-    
-    if 'r32g32b32a32' in fmt_str:
-        return 16
-    elif 'r32g32b32' in fmt_str:
-        return 12
-    elif 'r32g32' in fmt_str:
-        return 8
-    elif 'r32' in fmt_str:
-        return 4
-    elif 'r16g16b16a16' in fmt_str:
-        return 8
-    elif 'r16g16' in fmt_str:
-        return 4
-    elif 'r16' in fmt_str:
-        return 2
-    elif 'r8g8b8a8' in fmt_str:
-        return 4
-    elif 'r8g8' in fmt_str:
-        return 2
-    elif 'r8' in fmt_str:
-        return 1
-    else:
-        return 4
+    """估算格式的字节大小（分量数 × 分量字节宽度）"""
+    if fmt and fmt.compByteWidth:
+        return fmt.compCount * fmt.compByteWidth
+    return 4
+
+
+@functools.lru_cache(maxsize=None)
+def parse_semantic_name(semantic_name):
+    """拆分语义名为 (基名, 语义键)，例如 TEXCOORD01 -> ("TEXCOORD", "TEXCOORD1")"""
+    m = _SEMANTIC_RE.match(semantic_name)
+    base_name = m.group(1)
+    semantic_index = int(m.group(2)) if m.group(2) else 0
+    return base_name, f"{base_name}{semantic_index}"
 
 
 def setup_adb_port_forward():
@@ -149,8 +200,13 @@ def open_remote_capture(remote, rdc_path):
             remote_path = path_or_error
             print(f"   文件已复制到远程: {remote_path}")
         
+        # 分析只读取管线元数据，从不回读纹理 / 缓冲内容，因此使用最快的回放优化级别
+        replay_options = rd.ReplayOptions()
+        if hasattr(rd, 'ReplayOptimisationLevel'):
+            replay_options.optimisation = rd.ReplayOptimisationLevel.Fastest
+        
         # 打开捕获文件
-        result, controller = remote.OpenCapture(0, remote_path, rd.ReplayOptions(), None)
+        result, controller = remote.OpenCapture(0, remote_path, replay_options, None)
         
         if result != rd.ResultCode.Succeeded:
             print(f"❌ 无法打开捕获文件: {result}")
@@ -166,184 +222,94 @@ def open_remote_capture(remote, rdc_path):
         return None
 
 
-def analyze_vertex_attributes_remote(controller):
-    """分析顶点属性使用情况（远程版本）"""
+def analyze_all_remote(controller, root_actions, analyze_vertex=True, analyze_bindings=True):
+    """单次遍历分析顶点属性与 Shader 绑定（远程版本）
+
+    每个 Draw/Dispatch 只调用一次 SetFrameEvent + GetPipelineState，
+    两项分析共享同一份管线状态，避免重复的远程 RPC 往返。
+    远程查询由预取线程提交，主线程消费完成队列做分析，RPC 延迟与
+    Python 端计算相互重叠。
+
+    root_actions 由调用方通过 controller.GetRootActions() 获取一次后传入，
+    整个 Action 树只需跨 socket 传输一次。
+    """
     
-    # 统计数据
+    # 顶点属性统计
     total_draws = 0
     draws_with_waste = 0
     total_wasted_bytes_per_vertex = 0
     total_vertices_drawn = 0
-    waste_details = []
-    semantic_stats = defaultdict(lambda: {'provided': 0, 'used': 0, 'wasted': 0})
-    
-    print("\n正在扫描所有 Draw 调用...", flush=True)
-    
-    def process_action(action):
-        nonlocal total_draws, draws_with_waste, total_wasted_bytes_per_vertex, total_vertices_drawn
-        
-        flags = int(action.flags)
-        is_draw = flags & int(rd.ActionFlags.Drawcall)
-        
-        if is_draw:
-            total_draws += 1
-            
-            if total_draws % 50 == 0:
-                print(f"  已处理 {total_draws} 个 Draw...", flush=True)
-            
-            controller.SetFrameEvent(action.eventId, False)
-            pipe = controller.GetPipelineState()
-            
-            vs_shader = pipe.GetShader(rd.ShaderStage.Vertex)
-            if vs_shader == rd.ResourceId.Null():
-                for child in action.children:
-                    process_action(child)
-                return
-            
-            vs_refl = pipe.GetShaderReflection(rd.ShaderStage.Vertex)
-            if vs_refl is None:
-                for child in action.children:
-                    process_action(child)
-                return
-            
-            # 获取着色器实际使用的输入语义
-            shader_inputs = set()
-            for sig in vs_refl.inputSignature:
-                semantic_name = sig.semanticName if hasattr(sig, 'semanticName') else ''
-                semantic_index = sig.semanticIndex if hasattr(sig, 'semanticIndex') else 0
-                semantic_key = f"{semantic_name}{semantic_index}"
-                
-                channel_used_mask = getattr(sig, 'channelUsedMask', 0xF)
-                is_actually_used = channel_used_mask > 0
-                
-                if is_actually_used:
-                    shader_inputs.add(semantic_key)
-                    semantic_stats[semantic_name]['used'] += 1
-            
-            # 获取输入布局中提供的属性
-            try:
-                vertex_inputs = pipe.GetVertexInputs()
-            except:
-                vertex_inputs = []
-            
-            if not vertex_inputs:
-                for child in action.children:
-                    process_action(child)
-                return
-            
-            # 比较浪费
-            wasted_attrs = []
-            wasted_bytes = 0
-            
-            for attr in vertex_inputs:
-                semantic_name = attr.name if hasattr(attr, 'name') else ''
-                base_name = semantic_name.rstrip('0123456789')
-                semantic_index = ''
-                for c in reversed(semantic_name):
-                    if c.isdigit():
-                        semantic_index = c + semantic_index
-                    else:
-                        break
-                semantic_index = int(semantic_index) if semantic_index else 0
-                semantic_key = f"{base_name}{semantic_index}"
-                
-                fmt = attr.format if hasattr(attr, 'format') else None
-                byte_size = get_format_byte_size(fmt) if fmt else 4
-                
-                semantic_stats[base_name]['provided'] += 1
-                
-                if semantic_key not in shader_inputs:
-                    wasted_attrs.append({
-                        'name': semantic_name,
-                        'key': semantic_key,
-                        'size': byte_size
-                    })
-                    wasted_bytes += byte_size
-                    semantic_stats[base_name]['wasted'] += 1
-            
-            if wasted_attrs:
-                draws_with_waste += 1
-                num_vertices = action.numIndices if hasattr(action, 'numIndices') else 0
-                if num_vertices == 0:
-                    num_vertices = action.numVertices if hasattr(action, 'numVertices') else 0
-                
-                total_vertices_drawn += num_vertices
-                total_wasted_bytes_per_vertex += wasted_bytes * num_vertices
-                
-                waste_details.append({
-                    'eid': action.eventId,
-                    'num_vertices': num_vertices,
-                    'shader_needs': list(shader_inputs),
-                    'wasted': wasted_attrs,
-                    'wasted_bytes_per_vertex': wasted_bytes,
-                    'total_wasted_bytes': wasted_bytes * num_vertices
-                })
-        
-        for child in action.children:
-            process_action(child)
-    
-    root_actions = controller.GetRootActions()
-    for action in root_actions:
-        process_action(action)
-    
-    return {
-        'total_draws': total_draws,
-        'draws_with_waste': draws_with_waste,
-        'total_wasted_bytes': total_wasted_bytes_per_vertex,
-        'total_vertices': total_vertices_drawn,
-        'waste_details': waste_details,
-        'semantic_stats': dict(semantic_stats)
+    # 存在浪费的 Draw 按列存储（SoA），报告阶段只为 Top-N 行取详情
+    waste_details = {
+        'eid': array('q'),
+        'num_vertices': array('q'),
+        'wasted_bytes_per_vertex': array('q'),
+        'total_wasted_bytes': array('q'),
+        'shader_needs': [],
+        'wasted': [],
     }
-
-
-def analyze_shader_bindings_remote(controller):
-    """分析 Shader 绑定使用情况（远程版本）"""
+    semantic_stats = defaultdict(SemanticStat)
     
-    total_draws = 0
+    # Shader 绑定统计
+    total_bind_draws = 0
     total_bindings = 0
     unused_bindings = 0
-    binding_stats = defaultdict(lambda: {'total': 0, 'unused': 0})
+    binding_stats = defaultdict(BindingStat)
     unused_binding_details = []
     
-    def get_shader_stage_name(stage):
-        stage_names = {
-            int(rd.ShaderStage.Vertex): "VS",
-            int(rd.ShaderStage.Hull): "HS",
-            int(rd.ShaderStage.Domain): "DS",
-            int(rd.ShaderStage.Geometry): "GS",
-            int(rd.ShaderStage.Pixel): "PS",
-            int(rd.ShaderStage.Compute): "CS",
-        }
-        return stage_names.get(int(stage), f"Stage{int(stage)}")
+    print("\n正在扫描所有 Draw/Dispatch 调用...", flush=True)
+    
+    # 同一 RenderDoc 版本中绑定 / 反射对象的结构是固定的，按绑定类型只探测一次
+    # bind_type -> (has_descriptor, has_access, refl_has_name, refl_has_fixed_bind)
+    binding_schemas = {}
+    
+    def get_binding_schema(bind_type, bindings, refl_resources):
+        schema = binding_schemas.get(bind_type)
+        if schema is None or (refl_resources and schema[2] is None):
+            sample = bindings[0]
+            refl_sample = refl_resources[0] if refl_resources else None
+            schema = (
+                hasattr(sample, 'descriptor'),
+                hasattr(sample, 'access'),
+                hasattr(refl_sample, 'name') if refl_sample is not None else None,
+                hasattr(refl_sample, 'fixedBindNumber') if refl_sample is not None else None,
+            )
+            binding_schemas[bind_type] = schema
+        return schema
     
     def check_bindings(bindings, bind_type, stage_name, action, refl_resources=None):
         nonlocal total_bindings, unused_bindings
         
+        if not bindings:
+            return
+        
+        has_descriptor, has_access, refl_has_name, refl_has_fixed_bind = \
+            get_binding_schema(bind_type, bindings, refl_resources)
+        if not has_descriptor:
+            return
+        
+        num_refl = len(refl_resources) if refl_resources else 0
+        stats = binding_stats[bind_type]
+        
         for i, binding in enumerate(bindings):
-            if hasattr(binding, 'descriptor'):
-                res_id = binding.descriptor.resource
-            else:
-                continue
-            
-            if res_id == rd.ResourceId.Null():
+            if binding.descriptor.resource == _NULL_ID:
                 continue
             
             total_bindings += 1
-            binding_stats[bind_type]['total'] += 1
-            
-            is_unused = False
-            if hasattr(binding, 'access'):
-                is_unused = getattr(binding.access, 'staticallyUnused', False)
+            stats.total += 1
             
-            res_name = ""
-            slot_num = i
-            if refl_resources and i < len(refl_resources):
-                res_name = refl_resources[i].name if hasattr(refl_resources[i], 'name') else ""
-                slot_num = refl_resources[i].fixedBindNumber if hasattr(refl_resources[i], 'fixedBindNumber') else i
-            
-            if is_unused:
+            if has_access and getattr(binding.access, 'staticallyUnused', False):
+                res_name = ""
+                slot_num = i
+                if i < num_refl:
+                    refl_res = refl_resources[i]
+                    if refl_has_name:
+                        res_name = refl_res.name
+                    if refl_has_fixed_bind:
+                        slot_num = refl_res.fixedBindNumber
+                
                 unused_bindings += 1
-                binding_stats[bind_type]['unused'] += 1
+                stats.unused += 1
                 unused_binding_details.append({
                     'eid': action.eventId,
                     'stage': stage_name,
@@ -352,74 +318,336 @@ def analyze_shader_bindings_remote(controller):
                     'name': res_name
                 })
     
-    def process_action(action):
-        nonlocal total_draws
+    # 反射只取决于 Shader 本身，按 (stage, shader_id) 缓存，同一 Shader 只查询一次
+    refl_cache = {}
+    
+    def get_shader_reflection(pipe, stage, shader):
+        key = (int(stage), shader)
+        if key not in refl_cache:
+            refl_cache[key] = pipe.GetShaderReflection(stage)
+        return refl_cache[key]
+    
+    # PipeState 提供哪些查询接口取决于 RenderDoc 版本，首次取到管线状态时探测一次，
+    # 之后直接调用，不再在每个 Draw 上走异常处理
+    # (GetVertexInputs, GetConstantBlocks, GetReadOnlyResources, GetReadWriteResources)
+    pipe_api = None
+    
+    def fetch_event_state(action, is_draw, is_dispatch):
+        """切换到指定事件并抓取两项分析所需的全部远程数据（在预取线程中执行）"""
+        nonlocal pipe_api
         
-        flags = int(action.flags)
-        is_draw = flags & int(rd.ActionFlags.Drawcall)
-        is_dispatch = flags & int(rd.ActionFlags.Dispatch)
+        controller.SetFrameEvent(action.eventId, False)
+        pipe = controller.GetPipelineState()
         
-        if is_draw or is_dispatch:
-            total_draws += 1
-            
-            if total_draws % 50 == 0:
-                print(f"  已处理 {total_draws} 个 Draw/Dispatch...", flush=True)
-            
-            controller.SetFrameEvent(action.eventId, False)
-            pipe = controller.GetPipelineState()
-            
-            if is_dispatch:
-                stages = [rd.ShaderStage.Compute]
-            else:
-                stages = [rd.ShaderStage.Vertex, rd.ShaderStage.Pixel, 
-                         rd.ShaderStage.Geometry, rd.ShaderStage.Hull, rd.ShaderStage.Domain]
-            
+        if pipe_api is None:
+            pipe_api = (
+                hasattr(pipe, 'GetVertexInputs'),
+                hasattr(pipe, 'GetConstantBlocks'),
+                hasattr(pipe, 'GetReadOnlyResources'),
+                hasattr(pipe, 'GetReadWriteResources'),
+            )
+        has_vertex_inputs, has_constant_blocks, has_read_only, has_read_write = pipe_api
+        
+        vs_shader = None
+        vs_refl = None
+        vertex_inputs = []
+        if analyze_vertex and is_draw:
+            vs_shader = pipe.GetShader(rd.ShaderStage.Vertex)
+            if vs_shader != _NULL_ID:
+                vs_refl = get_shader_reflection(pipe, rd.ShaderStage.Vertex, vs_shader)
+                if vs_refl is not None and has_vertex_inputs:
+                    vertex_inputs = pipe.GetVertexInputs()
+        
+        stage_bindings = []
+        if analyze_bindings:
+            stages = _STAGES_DISPATCH if is_dispatch else _STAGES_DRAW
             for stage in stages:
-                shader = pipe.GetShader(stage)
-                if shader == rd.ResourceId.Null():
+                # 顶点分析已经取过 VS，不再重复查询
+                if stage == rd.ShaderStage.Vertex and vs_shader is not None:
+                    shader = vs_shader
+                else:
+                    shader = pipe.GetShader(stage)
+                if shader == _NULL_ID:
                     continue
                 
-                refl = pipe.GetShaderReflection(stage)
+                refl = get_shader_reflection(pipe, stage, shader)
                 if refl is None:
                     continue
                 
-                stage_name = get_shader_stage_name(stage)
+                cb_bindings = pipe.GetConstantBlocks(stage, False) if has_constant_blocks else None
+                ro_resources = pipe.GetReadOnlyResources(stage) if has_read_only else None
+                rw_resources = pipe.GetReadWriteResources(stage) if has_read_write else None
                 
-                try:
-                    cb_bindings = pipe.GetConstantBlocks(stage, False)
-                    refl_cbs = refl.constantBlocks if hasattr(refl, 'constantBlocks') else None
-                    check_bindings(cb_bindings, 'ConstantBuffer', stage_name, action, refl_cbs)
-                except:
-                    pass
-                
-                try:
-                    ro_resources = pipe.GetReadOnlyResources(stage)
-                    refl_srvs = refl.readOnlyResources if hasattr(refl, 'readOnlyResources') else None
-                    check_bindings(ro_resources, 'SRV', stage_name, action, refl_srvs)
-                except:
-                    pass
-                
-                try:
-                    rw_resources = pipe.GetReadWriteResources(stage)
-                    refl_uavs = refl.readWriteResources if hasattr(refl, 'readWriteResources') else None
-                    check_bindings(rw_resources, 'UAV', stage_name, action, refl_uavs)
-                except:
-                    pass
-        
-        for child in action.children:
-            process_action(child)
-    
-    root_actions = controller.GetRootActions()
-    for action in root_actions:
-        process_action(action)
-    
-    return {
-        'total_draws': total_draws,
-        'total_bindings': total_bindings,
-        'unused_bindings': unused_bindings,
-        'binding_stats': dict(binding_stats),
-        'unused_details': unused_binding_details[:50]
-    }
+                stage_bindings.append((stage, refl, cb_bindings, ro_resources, rw_resources))
+        
+        return vs_shader, vs_refl, vertex_inputs, stage_bindings
+    
+    # VS 输入语义按 Shader 缓存，输入布局的解析结果按布局签名缓存，
+    # 浪费计算结果按 (VS, 布局签名) 缓存——同一组合的 Draw 只有顶点数不同
+    shader_inputs_cache = {}
+    layout_cache = {}
+    waste_cache = {}
+    
+    def get_shader_inputs(vs_shader, vs_refl):
+        """返回 (着色器实际使用的语义键集合, 被使用的语义名列表)"""
+        cached = shader_inputs_cache.get(vs_shader)
+        if cached is not None:
+            return cached
+        
+        shader_inputs = set()
+        used_semantics = []
+        add_input = shader_inputs.add
+        add_used = used_semantics.append
+        for sig in vs_refl.inputSignature:
+            # channelUsedMask 为 0 表示该输入被编译器判定为未读取
+            if sig.channelUsedMask:
+                semantic_name = sig.semanticName
+                add_input(f"{semantic_name}{sig.semanticIndex}")
+                add_used(semantic_name)
+        
+        cached = shader_inputs_cache[vs_shader] = (shader_inputs, used_semantics)
+        return cached
+    
+    def get_layout_key(vertex_inputs):
+        """输入布局签名：(属性名, 顶点缓冲槽, 字节偏移, 字节数) 元组"""
+        byte_size_of = get_format_byte_size
+        return tuple(
+            (attr.name, attr.vertexBuffer, attr.byteOffset, byte_size_of(attr.format))
+            for attr in vertex_inputs
+        )
+    
+    def get_layout_attrs(layout_key):
+        """返回输入布局解析后的 (属性名, 语义基名, 语义键, 字节数) 列表"""
+        cached = layout_cache.get(layout_key)
+        if cached is not None:
+            return cached
+        
+        # 新布局：直接复用签名中已取出的名称与字节数，语义名解析跨布局共享缓存
+        layout_attrs = []
+        for semantic_name, _, _, byte_size in layout_key:
+            base_name, semantic_key = parse_semantic_name(semantic_name)
+            layout_attrs.append((semantic_name, base_name, semantic_key, byte_size))
+        
+        layout_cache[layout_key] = layout_attrs
+        return layout_attrs
+    
+    def get_vertex_waste(vs_shader, shader_inputs, layout_key):
+        """返回 (提供的语义基名列表, 浪费的语义基名列表, 浪费属性列表, 每顶点浪费字节数)"""
+        waste_key = (vs_shader, layout_key)
+        cached = waste_cache.get(waste_key)
+        if cached is not None:
+            return cached
+        
+        provided_names = []
+        wasted_names = []
+        wasted_attrs = []
+        wasted_bytes = 0
+        
+        for semantic_name, base_name, semantic_key, byte_size in get_layout_attrs(layout_key):
+            provided_names.append(base_name)
+            
+            if semantic_key not in shader_inputs:
+                wasted_attrs.append(WastedAttr(semantic_name, semantic_key, byte_size))
+                wasted_bytes += byte_size
+                wasted_names.append(base_name)
+        
+        cached = waste_cache[waste_key] = (provided_names, wasted_names, wasted_attrs, wasted_bytes)
+        return cached
+    
+    def process_vertex_attributes(action, vs_shader, vs_refl, vertex_inputs):
+        nonlocal draws_with_waste, total_wasted_bytes_per_vertex, total_vertices_drawn
+        
+        if vs_refl is None:
+            return
+        
+        # 获取着色器实际使用的输入语义
+        shader_inputs, used_semantics = get_shader_inputs(vs_shader, vs_refl)
+        stats_of = semantic_stats.__getitem__
+        for semantic_name in used_semantics:
+            stats_of(semantic_name).used += 1
+        
+        if not vertex_inputs:
+            return
+        
+        # 比较浪费（相同 VS + 布局只计算一次）
+        provided_names, wasted_names, wasted_attrs, wasted_bytes = \
+            get_vertex_waste(vs_shader, shader_inputs, get_layout_key(vertex_inputs))
+        
+        for base_name in provided_names:
+            stats_of(base_name).provided += 1
+        for base_name in wasted_names:
+            stats_of(base_name).wasted += 1
+        
+        if wasted_attrs:
+            draws_with_waste += 1
+            num_vertices = action.numIndices if hasattr(action, 'numIndices') else 0
+            if num_vertices == 0:
+                num_vertices = action.numVertices if hasattr(action, 'numVertices') else 0
+            
+            total_vertices_drawn += num_vertices
+            total_wasted_bytes_per_vertex += wasted_bytes * num_vertices
+            
+            waste_details['eid'].append(action.eventId)
+            waste_details['num_vertices'].append(num_vertices)
+            waste_details['wasted_bytes_per_vertex'].append(wasted_bytes)
+            waste_details['total_wasted_bytes'].append(wasted_bytes * num_vertices)
+            # shader_inputs 按 VS 缓存共享，这里只保存引用
+            waste_details['shader_needs'].append(shader_inputs)
+            waste_details['wasted'].append(wasted_attrs)
+    
+    def process_shader_bindings(action, stage_bindings):
+        for stage, refl, cb_bindings, ro_resources, rw_resources in stage_bindings:
+            stage_name = _STAGE_NAMES.get(int(stage), f"Stage{int(stage)}")
+            
+            if cb_bindings is not None:
+                refl_cbs = refl.constantBlocks if hasattr(refl, 'constantBlocks') else None
+                check_bindings(cb_bindings, 'ConstantBuffer', stage_name, action, refl_cbs)
+            
+            if ro_resources is not None:
+                refl_srvs = refl.readOnlyResources if hasattr(refl, 'readOnlyResources') else None
+                check_bindings(ro_resources, 'SRV', stage_name, action, refl_srvs)
+            
+            if rw_resources is not None:
+                refl_uavs = refl.readWriteResources if hasattr(refl, 'readWriteResources') else None
+                check_bindings(rw_resources, 'UAV', stage_name, action, refl_uavs)
+    
+    # 第一遍：只检查 flags 收集需要分析的事件，不产生任何远程调用
+    # 使用显式栈做先序遍历，避免深层 Action 树的递归开销与递归深度限制
+    events = []
+    
+    stack = list(reversed(root_actions))
+    while stack:
+        action = stack.pop()
+        
+        flags = int(action.flags)
+        is_draw = flags & _DRAW_FLAG
+        is_dispatch = flags & _DISPATCH_FLAG
+        
+        need_vertex = analyze_vertex and is_draw
+        need_bindings = analyze_bindings and (is_draw or is_dispatch)
+        
+        if need_vertex or need_bindings:
+            if need_vertex:
+                total_draws += 1
+            if need_bindings:
+                total_bind_draws += 1
+            events.append((action, is_draw, is_dispatch))
+        
+        # 绝大多数节点是叶子，跳过空子树的入栈
+        children = action.children
+        if children:
+            stack.extend(reversed(children))
+    
+    # 回放服务器按 EID 递增推进时可以增量应用命令，无需回退；
+    # 树序通常已是递增的，但跨兄弟 Marker 时并不保证
+    events.sort(key=lambda event: event[0].eventId)
+    
+    # 第二遍：预取线程按 EID 顺序提交远程查询，结果放入完成队列
+    # RenderDoc 的 ReplayController 不是线程安全的，所有 controller 调用都只在这一个线程中发生
+    # 主线程出错时通过 stop_event 通知预取线程在下一个事件前停止
+    completion_queue = queue.Queue(maxsize=PREFETCH_QUEUE_SIZE)
+    stop_event = threading.Event()
+    
+    def put(item):
+        """放入完成队列；被要求停止时放弃并返回 False"""
+        while not stop_event.is_set():
+            try:
+                completion_queue.put(item, timeout=PREFETCH_PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def prefetch_worker():
+        try:
+            for event in events:
+                if stop_event.is_set():
+                    return
+                if not put((event, fetch_event_state(*event))):
+                    return
+        except Exception as e:
+            put(e)
+            return
+        put(None)
+    
+    worker = threading.Thread(target=prefetch_worker, daemon=True)
+    worker.start()
+    
+    # 进度只以固定时间间隔刷新同一行；stdout 被重定向时写到 stderr，不污染报告
+    progress_stream = sys.stdout if sys.stdout.isatty() else sys.stderr
+    last_progress = 0.0
+    
+    processed = 0
+    try:
+        while True:
+            item = completion_queue.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            
+            (action, is_draw, is_dispatch), (vs_shader, vs_refl, vertex_inputs, stage_bindings) = item
+            
+            processed += 1
+            now = time.monotonic()
+            if now - last_progress >= PROGRESS_INTERVAL:
+                print(f"\r  已处理 {processed}/{len(events)} 个 Draw/Dispatch...",
+                      end='', file=progress_stream, flush=True)
+                last_progress = now
+            
+            if analyze_vertex and is_draw:
+                process_vertex_attributes(action, vs_shader, vs_refl, vertex_inputs)
+            if analyze_bindings:
+                process_shader_bindings(action, stage_bindings)
+    finally:
+        stop_event.set()
+        # 清空队列，让阻塞在 put 上的预取线程立即返回；join 之后 controller 上没有进行中的调用
+        while True:
+            try:
+                completion_queue.get_nowait()
+            except queue.Empty:
+                break
+        worker.join()
+    
+    print(f"\r  已处理 {processed}/{len(events)} 个 Draw/Dispatch", file=progress_stream, flush=True)
+    
+    results = {}
+    if analyze_vertex:
+        results['vertex'] = {
+            'total_draws': total_draws,
+            'draws_with_waste': draws_with_waste,
+            'total_wasted_bytes': total_wasted_bytes_per_vertex,
+            'total_vertices': total_vertices_drawn,
+            'waste_details': waste_details,
+            'semantic_stats': dict(semantic_stats)
+        }
+    if analyze_bindings:
+        results['bindings'] = {
+            'total_draws': total_bind_draws,
+            'total_bindings': total_bindings,
+            'unused_bindings': unused_bindings,
+            'binding_stats': dict(binding_stats),
+            'unused_details': unused_binding_details[:50]
+        }
+    return results
+
+
+def iter_top_waste_details(details, count):
+    """按总浪费从大到小逐个产出前 count 个 Draw 的 WasteDetail
+
+    Top-N 通过 heapq.nlargest 对行索引做部分选择（O(n log count)），
+    key 直接使用 C 实现的 array.__getitem__，不复制、不全量排序。
+    """
+    total_wasted = details['total_wasted_bytes']
+    for i in heapq.nlargest(count, range(len(total_wasted)), key=total_wasted.__getitem__):
+        yield WasteDetail(
+            details['eid'][i],
+            details['num_vertices'][i],
+            list(details['shader_needs'][i]),
+            details['wasted'][i],
+            details['wasted_bytes_per_vertex'][i],
+            total_wasted[i],
+        )
 
 
 def print_vertex_report(results):
@@ -447,28 +675,28 @@ def print_vertex_report(results):
     print(f"\n  {'语义名称':<20} {'提供次数':<12} {'使用次数':<12} {'浪费次数':<12}")
     print(f"  {'-'*55}")
     
-    sorted_semantics = sorted(results['semantic_stats'].items(), 
-                             key=lambda x: x[1]['wasted'], reverse=True)
+    # 先过滤掉空行再排序，只对会打印的语义排序
+    sorted_semantics = sorted(
+        ((name, stats) for name, stats in results['semantic_stats'].items()
+         if stats.provided > 0 or stats.used > 0),
+        key=lambda x: x[1].wasted, reverse=True)
     for semantic_name, stats in sorted_semantics:
-        if stats['provided'] > 0 or stats['used'] > 0:
-            print(f"  {semantic_name:<20} {stats['provided']:<12} {stats['used']:<12} {stats['wasted']:<12}")
+        print(f"  {semantic_name:<20} {stats.provided:<12} {stats.used:<12} {stats.wasted:<12}")
     
     # 显示浪费最严重的 Draw 调用
-    if results['waste_details']:
+    details = results['waste_details']
+    if details['eid']:
         print(f"\n{'='*80}")
         print("                浪费最严重的 Draw 调用 (前 10 个)")
         print("=" * 80)
         
-        sorted_waste = sorted(results['waste_details'], 
-                             key=lambda x: x['total_wasted_bytes'], reverse=True)
-        
-        for detail in sorted_waste[:10]:
-            print(f"\n  EID {detail['eid']}:")
-            print(f"    顶点数: {detail['num_vertices']:,}")
-            print(f"    着色器需要: {', '.join(detail['shader_needs'][:8])}...")
-            print(f"    浪费的属性: {', '.join([a['name'] for a in detail['wasted']])}")
-            print(f"    每顶点浪费: {detail['wasted_bytes_per_vertex']} bytes")
-            print(f"    总浪费: {format_size(detail['total_wasted_bytes'])}")
+        for detail in iter_top_waste_details(details, 10):
+            print(f"\n  EID {detail.eid}:")
+            print(f"    顶点数: {detail.num_vertices:,}")
+            print(f"    着色器需要: {', '.join(detail.shader_needs[:8])}...")
+            print(f"    浪费的属性: {', '.join([a.name for a in detail.wasted])}")
+            print(f"    每顶点浪费: {detail.wasted_bytes_per_vertex} bytes")
+            print(f"    总浪费: {format_size(detail.total_wasted_bytes)}")
 
 
 def print_binding_report(results):
@@ -490,9 +718,9 @@ def print_binding_report(results):
     print(f"  {'-'*45}")
     
     for bind_type in ['ConstantBuffer', 'SRV', 'UAV']:
-        stats = results['binding_stats'].get(bind_type, {'total': 0, 'unused': 0})
-        if stats['total'] > 0:
-            print(f"  {bind_type:<20} {stats['total']:<12} {stats['unused']:<12}")
+        stats = results['binding_stats'].get(bind_type)
+        if stats is not None and stats.total > 0:
+            print(f"  {bind_type:<20} {stats.total:<12} {stats.unused:<12}")
 
 
 def main():
@@ -526,20 +754,24 @@ def main():
         sys.exit(1)
     
     try:
-        # 执行分析
-        if not args.binding_only:
-            print("\n" + "=" * 80)
-            print("                    分析顶点属性使用情况")
-            print("=" * 80)
-            vertex_results = analyze_vertex_attributes_remote(controller)
-            print_vertex_report(vertex_results)
-        
-        if not args.vertex_only:
-            print("\n" + "=" * 80)
-            print("                    分析 Shader 绑定使用情况")
-            print("=" * 80)
-            binding_results = analyze_shader_bindings_remote(controller)
-            print_binding_report(binding_results)
+        # 执行分析：单次遍历同时完成两项分析
+        print("\n" + "=" * 80)
+        print("                    分析顶点属性与 Shader 绑定使用情况")
+        print("=" * 80)
+        # Action 树只获取一次
+        root_actions = controller.GetRootActions()
+        results = analyze_all_remote(
+            controller,
+            root_actions,
+            analyze_vertex=not args.binding_only,
+            analyze_bindings=not args.vertex_only,
+        )
+        
+        if 'vertex' in results:
+            print_vertex_report(results['vertex'])
+        
+        if 'bindings' in results:
+            print_binding_report(results['bindings'])
         
     finally:
         controller.Shutdown()
@@ -12,117 +12,114 @@ RenderDoc Android 几何复杂度分析脚本
 """
 
 import sys
-import os
 import argparse
-from collections import defaultdict
+import csv
+import heapq
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-# 自动添加 RenderDoc Python 模块路径
-RENDERDOC_MODULE_PATHS = [
-    r"E:\code build\renderdoc-1.x\renderdoc-1.x\x64\Development\pymodules",
-    r"E:\code build\RenderDoc_1.37_64",
-    r"C:\Program Files\RenderDoc",
-]
-for path in RENDERDOC_MODULE_PATHS:
-    if os.path.exists(path) and path not in sys.path:
-        sys.path.insert(0, path)
-        break
+# RenderDoc 模块路径设置、ADB 转发与远程连接统一由 rdc_session 处理
+from rdc_session import DEFAULT_HOST, DEFAULT_PORT, RdcSession
 
 import renderdoc as rd
 
-# 默认远程服务器配置
-DEFAULT_HOST = "localhost"
-DEFAULT_PORT = 38920
+# 高复杂度 Drawcall 的三角形阈值，以及报告中列出的数量
+HIGH_COMPLEXITY_TRIANGLES = 10000
+TOP_DRAW_COUNT = 20
+
+# ActionFlags 取整数值，热循环中直接做整数按位与
+_DRAW_FLAG = int(rd.ActionFlags.Drawcall)
+_PUSH_MARKER_FLAG = int(rd.ActionFlags.PushMarker)
+
+
+_FMT_M = "{:.2f}M".format
+_FMT_K = "{:.1f}K".format
 
 
 def format_number(num):
     """格式化数字"""
     if num >= 1_000_000:
-        return f"{num / 1_000_000:.2f}M"
+        return _FMT_M(num / 1_000_000)
     elif num >= 1_000:
-        return f"{num / 1_000:.1f}K"
+        return _FMT_K(num / 1_000)
     else:
         return str(num)
 
 
-def setup_adb_port_forward():
-    """设置 ADB 端口转发"""
-    import subprocess
-    try:
-        result = subprocess.run(
-            ["adb", "forward", f"tcp:{DEFAULT_PORT}", f"tcp:{DEFAULT_PORT}"],
-            capture_output=True,
-            text=True
-        )
-        if result.returncode == 0:
-            print(f"✅ ADB 端口转发设置成功: tcp:{DEFAULT_PORT}")
-            return True
-        else:
-            print(f"⚠️ ADB 端口转发失败: {result.stderr}")
-            return False
-    except FileNotFoundError:
-        print("⚠️ 未找到 adb 命令，请确保已安装 Android SDK 并配置环境变量")
-        return False
-
+def iter_draws(root_actions):
+    """先序遍历 Action 树，逐个产出 (eid, pass_name, num_indices, num_instances)
 
-def connect_to_remote_server(host, port):
-    """连接到远程 RenderDoc 服务器"""
-    print(f"\n正在连接远程服务器 {host}:{port}...")
+    只读取本地已获取的 Action 树，不产生任何远程调用。
+    """
+    has_num_indices = None
+    has_num_instances = None
     
-    try:
-        result, remote = rd.CreateRemoteServerConnection(host, port, None)
-        
-        if result != rd.ResultCode.Succeeded:
-            print(f"❌ 连接失败: {result}")
-            print("\n可能的原因:")
-            print("  1. Android 上的 RenderDoc Replay Server 未启动")
-            print("  2. ADB 端口转发未设置: adb forward tcp:38920 tcp:38920")
-            print("  3. 设备不在同一网络或端口被防火墙阻止")
-            return None
+    # 显式栈做先序遍历，每个节点携带其所属 Pass 名称
+    stack = deque((action, "Root") for action in reversed(root_actions))
+    
+    while stack:
+        action, current_pass = stack.pop()
+        flags = int(action.flags)
         
-        print(f"✅ 成功连接到远程服务器")
-        home_path = remote.HomeFolder()
-        print(f"   远程设备目录: {home_path}")
+        # 检测 Pass 标记
+        if flags & _PUSH_MARKER_FLAG:
+            current_pass = action.customName or f"Pass_{action.eventId}"
         
-        return remote
+        if flags & _DRAW_FLAG:
+            # Action 的字段集合由 RenderDoc 版本决定，只在第一个 Drawcall 上探测一次
+            if has_num_indices is None:
+                has_num_indices = hasattr(action, 'numIndices')
+                has_num_instances = hasattr(action, 'numInstances')
+            
+            yield (action.eventId, current_pass,
+                   action.numIndices if has_num_indices else 0,
+                   max(1, action.numInstances) if has_num_instances else 1)
         
-    except Exception as e:
-        print(f"❌ 连接异常: {e}")
-        return None
+        for child in reversed(action.children):
+            stack.append((child, current_pass))
 
 
-def open_remote_capture(remote, rdc_path):
-    """在远程设备上打开 RDC 文件"""
-    print(f"\n正在打开远程 RDC 文件: {rdc_path}")
-    
-    try:
-        local_progress = None
-        result, path_or_error = remote.CopyCaptureToRemote(rdc_path, local_progress)
-        
-        if result != rd.ResultCode.Succeeded:
-            print(f"   文件复制跳过，尝试直接打开...")
-            remote_path = rdc_path
-        else:
-            remote_path = path_or_error
-            print(f"   文件已复制到远程: {remote_path}")
-        
-        result, controller = remote.OpenCapture(0, remote_path, rd.ReplayOptions(), None)
-        
-        if result != rd.ResultCode.Succeeded:
-            print(f"❌ 无法打开捕获文件: {result}")
-            return None
-        
-        print(f"✅ 成功打开捕获文件")
-        return controller
+def collect_buffer_usage(controller):
+    """逐个 Buffer 查询使用记录，统计被绑定为 VB / IB 的次数
+
+    每个 Buffer 一次 GetUsage，无需逐个 Drawcall 切换事件。
+    返回 (vb_usage, ib_usage)，键为 ResourceId 的整数句柄。
+    """
+    buffers = controller.GetBuffers()
+    print(f"  正在查询 {len(buffers)} 个 Buffer 的 VB/IB 使用记录...", flush=True)
+    
+    VB_USAGE = rd.ResourceUsage.VertexBuffer
+    IB_USAGE = rd.ResourceUsage.IndexBuffer
+    vb_usage = {}
+    ib_usage = {}
+    
+    for buf in buffers:
+        vb_count = 0
+        ib_count = 0
+        for use in controller.GetUsage(buf.resourceId):
+            if use.usage == VB_USAGE:
+                vb_count += 1
+            elif use.usage == IB_USAGE:
+                ib_count += 1
         
-    except Exception as e:
-        print(f"❌ 打开捕获文件异常: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
+        # ResourceId 直接以整数句柄作为键，避免逐次 str() 格式化
+        if vb_count:
+            vb_usage[int(buf.resourceId)] = vb_count
+        if ib_count:
+            ib_usage[int(buf.resourceId)] = ib_count
+    
+    return vb_usage, ib_usage
 
 
-def analyze_geometry_remote(controller):
-    """分析几何复杂度（远程版本）"""
+def analyze_geometry_remote(controller, analyze_buffers=True, keep_details=False):
+    """分析几何复杂度（远程版本）
+
+    VB/IB 复用统计（按 Buffer 查询使用记录）在后台线程中执行，与本地 Action 树
+    的几何量统计重叠进行。analyze_buffers 为 False 时跳过复用统计。报告只用到
+    Top N 与汇总计数，keep_details 为 True 时才保留全部 Drawcall 明细
+    (results['draw_details'])。
+    """
     
     print("\n正在扫描所有 Drawcall...", flush=True)
     
@@ -132,35 +129,41 @@ def analyze_geometry_remote(controller):
     total_triangles = 0
     total_instances = 0
     
-    # Drawcall 详情列表
-    draw_details = []
-    
-    # 按 Pass 统计
-    pass_stats = defaultdict(lambda: {'draws': 0, 'vertices': 0, 'triangles': 0, 'instances': 0})
-    
-    # VB 使用统计（用于检测复用率）
-    vb_usage = defaultdict(int)
-    ib_usage = defaultdict(int)
-    
-    current_pass = "Root"
-    
-    def process_action(action, depth=0):
-        nonlocal total_draws, total_vertices, total_triangles, total_instances, current_pass
-        
-        # 检测 Pass 标记
-        if action.flags & rd.ActionFlags.PushMarker:
-            current_pass = action.customName or f"Pass_{action.eventId}"
+    # 报告只需要 Top N 和计数：用大小为 N 的最小堆边遍历边维护，
+    # 元素为 (total_triangles, -row, eid, instances, pass_name)，同三角形数时保留先出现的
+    top_heap = []
+    high_complexity_count = 0
+    instanced_draws = 0
+    instanced_triangles = 0
+    max_instances = 1
+    
+    # 完整明细仅在 keep_details 时按列存储（每个 Drawcall 一行），
+    # Pass 名称只存下标，名称表在 pass_ids 中
+    if keep_details:
+        draw_eids = array('q')
+        draw_instances = array('q')
+        draw_total_triangles = array('q')
+        draw_pass_idx = array('i')
+    pass_ids = {}
+    
+    # 按 Pass 统计：按 Pass 下标累加 [draws, vertices, triangles, instances]，
+    # 结束时再按名称组装成字典
+    pass_totals = []
+    
+    # VB/IB 复用统计只涉及远程调用，放到后台线程；当前线程同时遍历本地 Action 树
+    # 遍历出错时 with 块也会等后台查询结束，之后调用方才可能关闭 controller
+    root_actions = controller.GetRootActions()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        usage_future = None
+        if analyze_buffers:
+            usage_future = pool.submit(collect_buffer_usage, controller)
         
-        # 统计 Drawcall
-        if action.flags & rd.ActionFlags.Drawcall:
+        for eid, current_pass, num_indices, num_instances in iter_draws(root_actions):
             total_draws += 1
             
             if total_draws % 100 == 0:
                 print(f"  已处理 {total_draws} 个 Drawcall...", flush=True)
             
-            num_indices = action.numIndices if hasattr(action, 'numIndices') else 0
-            num_instances = max(1, action.numInstances) if hasattr(action, 'numInstances') else 1
-            
             # 估算三角形数
             triangles = num_indices // 3 * num_instances
             vertices = num_indices * num_instances
@@ -170,52 +173,46 @@ def analyze_geometry_remote(controller):
             total_instances += num_instances
             
             # Pass 统计
-            pass_stats[current_pass]['draws'] += 1
-            pass_stats[current_pass]['vertices'] += vertices
-            pass_stats[current_pass]['triangles'] += triangles
-            pass_stats[current_pass]['instances'] += num_instances
+            pass_idx = pass_ids.get(current_pass)
+            if pass_idx is None:
+                pass_idx = pass_ids[current_pass] = len(pass_totals)
+                pass_totals.append([0, 0, 0, 0])
+            totals = pass_totals[pass_idx]
+            totals[0] += 1
+            totals[1] += vertices
+            totals[2] += triangles
+            totals[3] += num_instances
             
-            # 记录详情
-            draw_details.append({
-                'eid': action.eventId,
-                'name': action.customName or f"Draw_{action.eventId}",
-                'pass': current_pass,
-                'vertices': num_indices,
-                'triangles': num_indices // 3,
-                'instances': num_instances,
-                'total_triangles': triangles
-            })
+            # 高复杂度 / Instancing 计数
+            if triangles > HIGH_COMPLEXITY_TRIANGLES:
+                high_complexity_count += 1
+            if num_instances > 1:
+                instanced_draws += 1
+                instanced_triangles += triangles
+                if num_instances > max_instances:
+                    max_instances = num_instances
+            
+            # 维护 Top N
+            if len(top_heap) < TOP_DRAW_COUNT:
+                heapq.heappush(top_heap, (triangles, -total_draws, eid, num_instances, current_pass))
+            elif triangles > top_heap[0][0]:
+                heapq.heapreplace(top_heap, (triangles, -total_draws, eid, num_instances, current_pass))
             
-            # 尝试获取 VB/IB 信息
-            try:
-                controller.SetFrameEvent(action.eventId, False)
-                pipe = controller.GetPipelineState()
-                
-                # 获取 VB
-                try:
-                    vb_list = pipe.GetVBuffers()
-                    for vb in vb_list:
-                        if hasattr(vb, 'resourceId') and vb.resourceId != rd.ResourceId.Null():
-                            vb_usage[str(vb.resourceId)] += 1
-                except:
-                    pass
-                
-                # 获取 IB
-                try:
-                    ib = pipe.GetIBuffer()
-                    if hasattr(ib, 'resourceId') and ib.resourceId != rd.ResourceId.Null():
-                        ib_usage[str(ib.resourceId)] += 1
-                except:
-                    pass
-            except:
-                pass
+            # 记录详情
+            if keep_details:
+                draw_eids.append(eid)
+                draw_instances.append(num_instances)
+                draw_total_triangles.append(triangles)
+                draw_pass_idx.append(pass_idx)
         
-        for child in action.children:
-            process_action(child, depth + 1)
-    
-    root_actions = controller.GetRootActions()
-    for action in root_actions:
-        process_action(action)
+        # 等待后台的 VB/IB 统计完成；没有 Drawcall 时复用率无意义
+        vb_usage = {}
+        ib_usage = {}
+        if usage_future is not None:
+            vb_usage, ib_usage = usage_future.result()
+            if not total_draws:
+                vb_usage = {}
+                ib_usage = {}
     
     # 计算复用率
     vb_reuse_rate = 0
@@ -231,15 +228,38 @@ def analyze_geometry_remote(controller):
         unique_ibs = len(ib_usage)
         ib_reuse_rate = total_ib_uses / unique_ibs if unique_ibs > 0 else 0
     
-    # 排序找出高复杂度 Drawcall
-    draw_details.sort(key=lambda x: x['total_triangles'], reverse=True)
+    pass_stats = {
+        pass_name: {'draws': draws, 'vertices': vertices, 'triangles': triangles, 'instances': instances}
+        for pass_name, (draws, vertices, triangles, instances) in zip(pass_ids, pass_totals)
+    }
+    
+    # 堆中只有 N 个元素，排成三角形数降序
+    top_draws = [
+        {'eid': eid, 'pass': pass_name, 'instances': instances, 'total_triangles': triangles}
+        for triangles, _, eid, instances, pass_name in sorted(top_heap, reverse=True)
+    ]
+    
+    draw_details = None
+    if keep_details:
+        draw_details = {
+            'eid': draw_eids,
+            'instances': draw_instances,
+            'total_triangles': draw_total_triangles,
+            'pass': draw_pass_idx,
+            'pass_names': list(pass_ids),
+        }
     
     return {
         'total_draws': total_draws,
         'total_vertices': total_vertices,
         'total_triangles': total_triangles,
         'total_instances': total_instances,
-        'pass_stats': dict(pass_stats),
+        'pass_stats': pass_stats,
+        'top_draws': top_draws,
+        'high_complexity_count': high_complexity_count,
+        'instanced_draws': instanced_draws,
+        'instanced_triangles': instanced_triangles,
+        'max_instances': max_instances,
         'draw_details': draw_details,
         'vb_reuse_rate': vb_reuse_rate,
         'ib_reuse_rate': ib_reuse_rate,
@@ -251,28 +271,32 @@ def analyze_geometry_remote(controller):
 def print_geometry_report(results):
     """打印几何复杂度报告"""
     
-    print("\n" + "=" * 70)
-    print("                      📊 几何复杂度总览")
-    print("=" * 70)
+    # 报告先缓存到列表，最后一次性写出
+    out = []
+    w = out.append
+    
+    w("\n" + "=" * 70)
+    w("                      📊 几何复杂度总览")
+    w("=" * 70)
     
-    print(f"\n  总 Drawcall 数:         {results['total_draws']:,}")
-    print(f"  总顶点数:               {format_number(results['total_vertices'])}")
-    print(f"  总三角形数:             {format_number(results['total_triangles'])}")
-    print(f"  总实例数:               {results['total_instances']:,}")
+    w(f"\n  总 Drawcall 数:         {results['total_draws']:,}")
+    w(f"  总顶点数:               {format_number(results['total_vertices'])}")
+    w(f"  总三角形数:             {format_number(results['total_triangles'])}")
+    w(f"  总实例数:               {results['total_instances']:,}")
     
     if results['total_draws'] > 0:
         avg_tris = results['total_triangles'] / results['total_draws']
-        print(f"\n  平均每 Drawcall 三角形: {format_number(int(avg_tris))}")
+        w(f"\n  平均每 Drawcall 三角形: {format_number(int(avg_tris))}")
     
     # 缓冲区复用率
-    print("\n" + "-" * 70)
-    print("                    🔄 缓冲区复用分析")
-    print("-" * 70)
+    w("\n" + "-" * 70)
+    w("                    🔄 缓冲区复用分析")
+    w("-" * 70)
     
-    print(f"\n  唯一 VB 数量:           {results['unique_vbs']}")
-    print(f"  唯一 IB 数量:           {results['unique_ibs']}")
-    print(f"  VB 平均复用率:          {results['vb_reuse_rate']:.2f}x")
-    print(f"  IB 平均复用率:          {results['ib_reuse_rate']:.2f}x")
+    w(f"\n  唯一 VB 数量:           {results['unique_vbs']}")
+    w(f"  唯一 IB 数量:           {results['unique_ibs']}")
+    w(f"  VB 平均复用率:          {results['vb_reuse_rate']:.2f}x")
+    w(f"  IB 平均复用率:          {results['ib_reuse_rate']:.2f}x")
     
     # 复用率评级
     if results['vb_reuse_rate'] > 3:
@@ -281,98 +305,131 @@ def print_geometry_report(results):
         reuse_rating = "👍 良好"
     else:
         reuse_rating = "⚠️ 较低"
-    print(f"  复用率评级:             {reuse_rating}")
+    w(f"  复用率评级:             {reuse_rating}")
     
     # 按 Pass 统计
-    print("\n" + "-" * 70)
-    print("                 🏆 几何量最高的 Pass (Top 15)")
-    print("-" * 70)
+    w("\n" + "-" * 70)
+    w("                 🏆 几何量最高的 Pass (Top 15)")
+    w("-" * 70)
     
     pass_stats = results['pass_stats']
-    sorted_passes = sorted(pass_stats.items(), key=lambda x: x[1]['triangles'], reverse=True)
+    top_passes = heapq.nlargest(15, pass_stats.items(), key=lambda x: x[1]['triangles'])
     
-    print(f"\n  {'Pass 名称':<30} {'Drawcall':>8} {'三角形':>12}")
-    print("  " + "-" * 55)
+    w(f"\n  {'Pass 名称':<30} {'Drawcall':>8} {'三角形':>12}")
+    w("  " + "-" * 55)
     
-    for pass_name, stats in sorted_passes[:15]:
+    for pass_name, stats in top_passes:
         name = pass_name[:28] + ".." if len(pass_name) > 30 else pass_name
-        print(f"  {name:<30} {stats['draws']:>8} {format_number(stats['triangles']):>12}")
+        w(f"  {name:<30} {stats['draws']:>8} {format_number(stats['triangles']):>12}")
     
     # 高复杂度 Drawcall
-    print("\n" + "-" * 70)
-    print("            ⚠️ 高复杂度 Drawcall (Top 20)")
-    print("-" * 70)
+    w("\n" + "-" * 70)
+    w("            ⚠️ 高复杂度 Drawcall (Top 20)")
+    w("-" * 70)
     
-    draw_details = results['draw_details']
+    high_count = results['high_complexity_count']
     
-    # 过滤出三角形 > 10K 的
-    high_complexity = [d for d in draw_details if d['total_triangles'] > 10000]
-    
-    if high_complexity:
-        print(f"\n  共发现 {len(high_complexity)} 个高复杂度 Drawcall (> 10K 三角形)\n")
-        print(f"  {'EID':<8} {'三角形':>12} {'实例数':>10} {'Pass 名称'}")
-        print("  " + "-" * 60)
+    if high_count:
+        w(f"\n  共发现 {high_count} 个高复杂度 Drawcall (> 10K 三角形)\n")
+        w(f"  {'EID':<8} {'三角形':>12} {'实例数':>10} {'Pass 名称'}")
+        w("  " + "-" * 60)
         
-        for d in high_complexity[:20]:
+        # Top N 按三角形数降序，高复杂度行是其前缀，遇到第一个不满足的即可停止
+        for d in results['top_draws']:
+            if d['total_triangles'] <= HIGH_COMPLEXITY_TRIANGLES:
+                break
             pass_name = d['pass'][:25] + ".." if len(d['pass']) > 27 else d['pass']
-            print(f"  {d['eid']:<8} {format_number(d['total_triangles']):>12} {d['instances']:>10} {pass_name}")
+            w(f"  {d['eid']:<8} {format_number(d['total_triangles']):>12} {d['instances']:>10} {pass_name}")
         
-        if len(high_complexity) > 20:
-            print(f"\n  ... 还有 {len(high_complexity) - 20} 个未显示")
+        if high_count > TOP_DRAW_COUNT:
+            w(f"\n  ... 还有 {high_count - TOP_DRAW_COUNT} 个未显示")
     else:
-        print("\n  ✅ 没有发现高复杂度 Drawcall (> 10K 三角形)")
+        w("\n  ✅ 没有发现高复杂度 Drawcall (> 10K 三角形)")
     
     # Instancing 使用情况
-    print("\n" + "-" * 70)
-    print("                    📦 Instancing 使用分析")
-    print("-" * 70)
-    
-    instanced_draws = [d for d in draw_details if d['instances'] > 1]
-    if instanced_draws:
-        print(f"\n  使用 Instancing 的 Drawcall: {len(instanced_draws)} 个")
-        total_instanced_tris = sum(d['total_triangles'] for d in instanced_draws)
-        print(f"  Instancing 渲染的三角形:   {format_number(total_instanced_tris)}")
-        
-        max_instances = max(d['instances'] for d in instanced_draws)
-        print(f"  最大实例数:                 {max_instances}")
+    w("\n" + "-" * 70)
+    w("                    📦 Instancing 使用分析")
+    w("-" * 70)
+    
+    instanced_count = results['instanced_draws']
+    if instanced_count:
+        w(f"\n  使用 Instancing 的 Drawcall: {instanced_count} 个")
+        w(f"  Instancing 渲染的三角形:   {format_number(results['instanced_triangles'])}")
+        w(f"  最大实例数:                 {results['max_instances']}")
     else:
-        print("\n  ⚠️ 未检测到 Instancing 使用")
+        w("\n  ⚠️ 未检测到 Instancing 使用")
     
     # 优化建议
-    print("\n" + "=" * 70)
-    print("                       💡 几何优化建议")
-    print("=" * 70)
+    w("\n" + "=" * 70)
+    w("                       💡 几何优化建议")
+    w("=" * 70)
     
     suggestions = []
     
     if results['total_triangles'] > 5_000_000:
         suggestions.append(f"  • 总三角形数较高 ({format_number(results['total_triangles'])})，考虑 LOD 系统")
     
-    if len(high_complexity) > 10:
-        suggestions.append(f"  • 存在 {len(high_complexity)} 个高复杂度 Drawcall，检查是否可以简化模型")
+    if high_count > 10:
+        suggestions.append(f"  • 存在 {high_count} 个高复杂度 Drawcall，检查是否可以简化模型")
     
     if results['vb_reuse_rate'] < 1.5:
         suggestions.append("  • 缓冲区复用率较低，考虑合并相同材质的网格")
     
-    if not instanced_draws and results['total_draws'] > 100:
+    if not instanced_count and results['total_draws'] > 100:
         suggestions.append("  • 未使用 Instancing，对于重复对象可以显著减少 Drawcall")
     
     if results['total_draws'] > 2000:
         suggestions.append(f"  • Drawcall 数量较多 ({results['total_draws']})，考虑批处理或合并")
     
     if not suggestions:
-        print("  ✅ 几何复杂度情况良好，没有明显问题")
+        w("  ✅ 几何复杂度情况良好，没有明显问题")
     else:
         for s in suggestions:
-            print(s)
+            w(s)
+    
+    sys.stdout.write("\n".join(out) + "\n")
+
+
+def export_draw_details_csv(draw_details, csv_path):
+    """导出全部 Drawcall 明细到 CSV"""
+    pass_names = draw_details['pass_names']
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['eid', 'pass', 'instances', 'total_triangles'])
+        for eid, pass_idx, instances, triangles in zip(
+                draw_details['eid'], draw_details['pass'],
+                draw_details['instances'], draw_details['total_triangles']):
+            writer.writerow([eid, pass_names[pass_idx], instances, triangles])
+    print(f"\n✅ Drawcall 明细已导出: {csv_path} ({len(draw_details['eid'])} 行)")
 
 
-def main():
+def run_geometry_analysis(controller, analyze_buffers=True, full_csv=None):
+    """在已打开的 controller 上执行几何复杂度分析并打印报告"""
+    print("\n" + "=" * 70)
+    print("                    分析几何复杂度")
+    print("=" * 70)
+    results = analyze_geometry_remote(controller, analyze_buffers=analyze_buffers,
+                                      keep_details=full_csv is not None)
+    print_geometry_report(results)
+    if full_csv is not None:
+        export_draw_details_csv(results['draw_details'], full_csv)
+    return results
+
+
+def main(controller=None):
+    """命令行入口；传入已打开的 controller 时直接分析，不再建立远程会话"""
+    if controller is not None:
+        return run_geometry_analysis(controller)
+    
     parser = argparse.ArgumentParser(description='RenderDoc Android 几何复杂度分析')
     parser.add_argument('rdc_path', help='Android 设备上的 RDC 文件路径')
     parser.add_argument('--host', default=DEFAULT_HOST, help=f'远程服务器地址 (默认: {DEFAULT_HOST})')
     parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'远程服务器端口 (默认: {DEFAULT_PORT})')
     parser.add_argument('--no-forward', action='store_true', help='跳过 ADB 端口转发设置')
+    parser.add_argument('--skip-buffers', action='store_true',
+                        help='跳过 VB/IB 复用率统计（不查询 Buffer 使用记录，速度最快）')
+    parser.add_argument('--full', metavar='CSV_PATH',
+                        help='保留全部 Drawcall 明细并导出到 CSV（默认只统计 Top 20）')
     
     args = parser.parse_args()
     
@@ -380,28 +437,10 @@ def main():
     print("       RenderDoc Android 几何复杂度分析工具")
     print("=" * 70)
     
-    if not args.no_forward and args.host == "localhost":
-        setup_adb_port_forward()
-    
-    remote = connect_to_remote_server(args.host, args.port)
-    if remote is None:
-        sys.exit(1)
-    
-    controller = open_remote_capture(remote, args.rdc_path)
-    if controller is None:
-        remote.Shutdown()
-        sys.exit(1)
-    
-    try:
-        print("\n" + "=" * 70)
-        print("                    分析几何复杂度")
-        print("=" * 70)
-        results = analyze_geometry_remote(controller)
-        print_geometry_report(results)
-        
-    finally:
-        controller.Shutdown()
-        remote.Shutdown()
+    with RdcSession(args.rdc_path, args.host, args.port, forward=not args.no_forward) as controller:
+        if controller is None:
+            sys.exit(1)
+        run_geometry_analysis(controller, analyze_buffers=not args.skip_buffers, full_csv=args.full)
     
     print("\n" + "=" * 70)
     print("                         分析完成!")
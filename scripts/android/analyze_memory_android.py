@@ -12,183 +12,102 @@ RenderDoc Android 内存分析脚本
 """
 
 import sys
-import os
 import argparse
+import bisect
+import functools
+import heapq
 from collections import defaultdict
 
-# 自动添加 RenderDoc Python 模块路径
-RENDERDOC_MODULE_PATHS = [
-    r"E:\code build\renderdoc-1.x\renderdoc-1.x\x64\Development\pymodules",
-    r"E:\code build\RenderDoc_1.37_64",
-    r"C:\Program Files\RenderDoc",
-]
-for path in RENDERDOC_MODULE_PATHS:
-    if os.path.exists(path) and path not in sys.path:
-        sys.path.insert(0, path)
-        break
+# RenderDoc 模块路径设置、ADB 转发与远程连接统一由 rdc_session 处理
+from rdc_session import DEFAULT_HOST, DEFAULT_PORT, RdcSession
 
 import renderdoc as rd
 
-# 默认远程服务器配置
-DEFAULT_HOST = "localhost"
-DEFAULT_PORT = 38920
+# 纹理尺寸分布区间：max(宽, 高) 不超过上界即落入对应区间，超过最后一个上界归入 '> 2048'
+SIZE_BUCKET_BOUNDS = (64, 256, 512, 1024, 2048)
+SIZE_BUCKET_LABELS = ('<= 64', '65 - 256', '257 - 512', '513 - 1024', '1025 - 2048', '> 2048')
+
+
+_FMT_B = "{} B".format
+_FMT_KB = "{:.1f} KB".format
+_FMT_MB = "{:.2f} MB".format
+_FMT_GB = "{:.2f} GB".format
 
 
 def format_size(size_bytes):
     """格式化字节大小"""
     if size_bytes < 1024:
-        return f"{size_bytes} B"
-    elif size_bytes < 1024 * 1024:
-        return f"{size_bytes / 1024:.1f} KB"
-    elif size_bytes < 1024 * 1024 * 1024:
-        return f"{size_bytes / (1024 * 1024):.2f} MB"
+        return _FMT_B(size_bytes)
+    elif size_bytes < 1048576:
+        return _FMT_KB(size_bytes / 1024)
+    elif size_bytes < 1073741824:
+        return _FMT_MB(size_bytes / 1048576)
     else:
-        return f"{size_bytes / (1024 * 1024 * 1024):.2f} GB"
+        return _FMT_GB(size_bytes / 1073741824)
 
 
-def get_texture_size(tex):
-    """估算纹理大小"""
-    try:
-        width = tex.width
-        height = max(1, tex.height)
-        depth = max(1, tex.depth)
-        array_size = max(1, tex.arraysize)
-        mips = max(1, tex.mips)
-        
-        # 估算每像素字节数
-        fmt_str = str(tex.format.type).lower() if hasattr(tex.format, 'type') else str(tex.format).lower()
-        
-        if 'bc1' in fmt_str or 'dxt1' in fmt_str:
-            bytes_per_pixel = 0.5
-        elif 'bc2' in fmt_str or 'bc3' in fmt_str or 'bc5' in fmt_str or 'bc7' in fmt_str:
-            bytes_per_pixel = 1
-        elif 'bc4' in fmt_str:
-            bytes_per_pixel = 0.5
-        elif 'bc6' in fmt_str:
-            bytes_per_pixel = 1
-        elif 'r32g32b32a32' in fmt_str:
-            bytes_per_pixel = 16
-        elif 'r32g32b32' in fmt_str:
-            bytes_per_pixel = 12
-        elif 'r32g32' in fmt_str:
-            bytes_per_pixel = 8
-        elif 'r32' in fmt_str or 'd32' in fmt_str:
-            bytes_per_pixel = 4
-        elif 'r16g16b16a16' in fmt_str:
-            bytes_per_pixel = 8
-        elif 'r16g16' in fmt_str:
-            bytes_per_pixel = 4
-        elif 'r16' in fmt_str or 'd16' in fmt_str:
-            bytes_per_pixel = 2
-        elif 'r11g11b10' in fmt_str:
-            bytes_per_pixel = 4
-        elif 'r10g10b10a2' in fmt_str:
-            bytes_per_pixel = 4
-        elif 'd24' in fmt_str or 'd32' in fmt_str:
-            bytes_per_pixel = 4
-        elif 'r8g8b8a8' in fmt_str or 'b8g8r8a8' in fmt_str:
-            bytes_per_pixel = 4
-        elif 'r8g8' in fmt_str:
-            bytes_per_pixel = 2
-        elif 'r8' in fmt_str:
-            bytes_per_pixel = 1
-        elif 'astc' in fmt_str:
-            bytes_per_pixel = 1  # ASTC 压缩
-        elif 'etc2' in fmt_str or 'etc1' in fmt_str:
-            bytes_per_pixel = 0.5  # ETC 压缩
-        else:
-            bytes_per_pixel = 4
-        
-        # 计算 mipmap 总大小
-        total_size = 0
-        for mip in range(mips):
-            mip_w = max(1, width >> mip)
-            mip_h = max(1, height >> mip)
-            mip_d = max(1, depth >> mip)
-            total_size += mip_w * mip_h * mip_d * bytes_per_pixel
-        
-        total_size *= array_size
-        return int(total_size)
-        
-    except Exception as e:
-        return 0
+# 压缩格式每像素字节数，按 ResourceFormatType 枚举值查表
+COMPRESSED_BPP = {
+    getattr(rd.ResourceFormatType, name): bpp
+    for name, bpp in (
+        ('BC1', 0.5), ('BC4', 0.5),
+        ('BC2', 1), ('BC3', 1), ('BC5', 1), ('BC6', 1), ('BC7', 1),
+        ('ASTC', 1),
+        ('ETC2', 0.5), ('EAC', 0.5),
+    )
+    if hasattr(rd.ResourceFormatType, name)
+}
 
 
-def setup_adb_port_forward():
-    """设置 ADB 端口转发"""
-    import subprocess
-    try:
-        result = subprocess.run(
-            ["adb", "forward", f"tcp:{DEFAULT_PORT}", f"tcp:{DEFAULT_PORT}"],
-            capture_output=True,
-            text=True
-        )
-        if result.returncode == 0:
-            print(f"✅ ADB 端口转发设置成功: tcp:{DEFAULT_PORT}")
-            return True
-        else:
-            print(f"⚠️ ADB 端口转发失败: {result.stderr}")
-            return False
-    except FileNotFoundError:
-        print("⚠️ 未找到 adb 命令，请确保已安装 Android SDK 并配置环境变量")
-        return False
+# 非压缩格式判断用到的枚举值，模块加载时绑定一次
+_REGULAR_FORMAT_TYPE = rd.ResourceFormatType.Regular
+_DEPTH_COMP_TYPE = rd.CompType.Depth
 
 
-def connect_to_remote_server(host, port):
-    """连接到远程 RenderDoc 服务器"""
-    print(f"\n正在连接远程服务器 {host}:{port}...")
+def is_uncompressed_heavy_format(fmt):
+    """是否为占用较高的非压缩颜色格式 (RGBA8 / 16 位 / 32 位分量)
     
-    try:
-        result, remote = rd.CreateRemoteServerConnection(host, port, None)
-        
-        if result != rd.ResultCode.Succeeded:
-            print(f"❌ 连接失败: {result}")
-            print("\n可能的原因:")
-            print("  1. Android 上的 RenderDoc Replay Server 未启动")
-            print("  2. ADB 端口转发未设置: adb forward tcp:38920 tcp:38920")
-            print("  3. 设备不在同一网络或端口被防火墙阻止")
-            return None
-        
-        print(f"✅ 成功连接到远程服务器")
-        home_path = remote.HomeFolder()
-        print(f"   远程设备目录: {home_path}")
-        
-        return remote
-        
-    except Exception as e:
-        print(f"❌ 连接异常: {e}")
-        return None
+    直接读取 ResourceFormat 的字段判断，不生成格式名称字符串；深度格式无法压缩，不计入。
+    """
+    if fmt.type != _REGULAR_FORMAT_TYPE or fmt.compType == _DEPTH_COMP_TYPE:
+        return False
+    comp_width = fmt.compByteWidth
+    return comp_width >= 2 or (comp_width == 1 and fmt.compCount == 4)
 
 
-def open_remote_capture(remote, rdc_path):
-    """在远程设备上打开 RDC 文件"""
-    print(f"\n正在打开远程 RDC 文件: {rdc_path}")
-    
+def format_type_name(fmt_key):
+    """把格式统计用的整数键还原为 ResourceFormatType 名称（仅在输出时调用）"""
+    return str(rd.ResourceFormatType(fmt_key))
+
+
+def get_format_bpp(fmt):
+    """估算每像素字节数：压缩格式查表，其余为 分量字节宽度 × 分量数"""
+    return COMPRESSED_BPP.get(fmt.type, fmt.compByteWidth * fmt.compCount or 4)
+
+
+@functools.lru_cache(maxsize=None)
+def get_mip_chain_texels(width, height, depth, mips):
+    """计算完整 mip 链的像素总数（相同尺寸的纹理共享结果）"""
+    total = 0
+    for mip in range(mips):
+        mip_w = width >> mip or 1
+        mip_h = height >> mip or 1
+        mip_d = depth >> mip or 1
+        if mip_w == mip_h == mip_d == 1:
+            # 已缩到 1x1x1，剩余各级每级只有 1 个像素
+            return total + mips - mip
+        total += mip_w * mip_h * mip_d
+    return total
+
+
+def get_texture_size(tex):
+    """估算纹理大小"""
     try:
-        local_progress = None
-        result, path_or_error = remote.CopyCaptureToRemote(rdc_path, local_progress)
-        
-        if result != rd.ResultCode.Succeeded:
-            print(f"   文件复制跳过，尝试直接打开...")
-            remote_path = rdc_path
-        else:
-            remote_path = path_or_error
-            print(f"   文件已复制到远程: {remote_path}")
-        
-        result, controller = remote.OpenCapture(0, remote_path, rd.ReplayOptions(), None)
-        
-        if result != rd.ResultCode.Succeeded:
-            print(f"❌ 无法打开捕获文件: {result}")
-            return None
-        
-        print(f"✅ 成功打开捕获文件")
-        return controller
+        texels = get_mip_chain_texels(tex.width, max(1, tex.height), max(1, tex.depth), max(1, tex.mips))
+        return int(texels * get_format_bpp(tex.format) * max(1, tex.arraysize))
         
     except Exception as e:
-        print(f"❌ 打开捕获文件异常: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
+        return 0
 
 
 def analyze_memory_remote(controller):
@@ -201,6 +120,7 @@ def analyze_memory_remote(controller):
     buffer_memory = 0
     texture_count = 0
     buffer_count = 0
+    uncompressed_size = 0
     
     # 按格式统计
     format_stats = defaultdict(lambda: {'count': 0, 'size': 0})
@@ -209,7 +129,7 @@ def analyze_memory_remote(controller):
     # 大纹理列表
     large_textures = []
     # 纹理尺寸分布
-    texture_size_distribution = defaultdict(int)
+    size_bucket_counts = [0] * len(SIZE_BUCKET_LABELS)
     
     # 处理纹理
     textures = controller.GetTextures()
@@ -218,26 +138,29 @@ def analyze_memory_remote(controller):
         size = get_texture_size(tex)
         texture_memory += size
         
-        # 格式统计
-        fmt_name = str(tex.format.type) if hasattr(tex.format, 'type') else str(tex.format)
-        format_stats[fmt_name]['count'] += 1
-        format_stats[fmt_name]['size'] += size
+        # 格式统计：以枚举整数值为键，名称留到输出时再解析
+        fmt_key = int(tex.format.type)
+        fmt_stat = format_stats[fmt_key]
+        fmt_stat['count'] += 1
+        fmt_stat['size'] += size
+        # 块压缩格式不是 Regular 类型，is_uncompressed_heavy_format 对其返回 False
+        if is_uncompressed_heavy_format(tex.format):
+            uncompressed_size += size
         
         # 用途统计
         if hasattr(tex, 'creationFlags') and hasattr(rd, 'TextureCategory'):
             flags = tex.creationFlags
             if flags & rd.TextureCategory.ColorTarget:
-                usage_stats['RenderTarget']['count'] += 1
-                usage_stats['RenderTarget']['size'] += size
+                usage_name = 'RenderTarget'
             elif flags & rd.TextureCategory.DepthTarget:
-                usage_stats['DepthStencil']['count'] += 1
-                usage_stats['DepthStencil']['size'] += size
+                usage_name = 'DepthStencil'
             elif flags & rd.TextureCategory.ShaderRead:
-                usage_stats['ShaderResource']['count'] += 1
-                usage_stats['ShaderResource']['size'] += size
+                usage_name = 'ShaderResource'
             else:
-                usage_stats['Other']['count'] += 1
-                usage_stats['Other']['size'] += size
+                usage_name = 'Other'
+            usage_stat = usage_stats[usage_name]
+            usage_stat['count'] += 1
+            usage_stat['size'] += size
         
         # 大纹理检测 (> 4MB)
         if size > 4 * 1024 * 1024:
@@ -247,24 +170,12 @@ def analyze_memory_remote(controller):
                 'height': tex.height,
                 'depth': tex.depth,
                 'mips': tex.mips,
-                'format': fmt_name,
+                'format': fmt_key,
                 'size': size
             })
         
         # 尺寸分布
-        max_dim = max(tex.width, tex.height)
-        if max_dim <= 64:
-            texture_size_distribution['<= 64'] += 1
-        elif max_dim <= 256:
-            texture_size_distribution['65 - 256'] += 1
-        elif max_dim <= 512:
-            texture_size_distribution['257 - 512'] += 1
-        elif max_dim <= 1024:
-            texture_size_distribution['513 - 1024'] += 1
-        elif max_dim <= 2048:
-            texture_size_distribution['1025 - 2048'] += 1
-        else:
-            texture_size_distribution['> 2048'] += 1
+        size_bucket_counts[bisect.bisect_left(SIZE_BUCKET_BOUNDS, max(tex.width, tex.height))] += 1
     
     # 处理 Buffer
     buffers = controller.GetBuffers()
@@ -273,87 +184,93 @@ def analyze_memory_remote(controller):
         size = buf.length
         buffer_memory += size
     
-    large_textures.sort(key=lambda x: x['size'], reverse=True)
+    texture_size_distribution = {
+        label: count for label, count in zip(SIZE_BUCKET_LABELS, size_bucket_counts) if count
+    }
     
     return {
         'texture_memory': texture_memory,
         'buffer_memory': buffer_memory,
         'texture_count': texture_count,
         'buffer_count': buffer_count,
+        'uncompressed_size': uncompressed_size,
         'format_stats': dict(format_stats),
         'usage_stats': dict(usage_stats),
-        'large_textures': large_textures[:20],  # Top 20
-        'texture_size_distribution': dict(texture_size_distribution)
+        'large_textures': heapq.nlargest(20, large_textures, key=lambda x: x['size']),  # Top 20
+        'texture_size_distribution': texture_size_distribution
     }
 
 
 def print_memory_report(results):
     """打印内存分析报告"""
     
-    print("\n" + "=" * 70)
-    print("                      📊 GPU 内存使用总览")
-    print("=" * 70)
+    # 报告先缓存到列表，最后一次性写出
+    out = []
+    w = out.append
+    
+    w("\n" + "=" * 70)
+    w("                      📊 GPU 内存使用总览")
+    w("=" * 70)
     
     total_memory = results['texture_memory'] + results['buffer_memory']
     
-    print(f"\n  总 GPU 内存占用:        {format_size(total_memory)}")
-    print(f"  ├─ 纹理内存:            {format_size(results['texture_memory'])} ({results['texture_count']} 个)")
-    print(f"  └─ Buffer 内存:         {format_size(results['buffer_memory'])} ({results['buffer_count']} 个)")
+    w(f"\n  总 GPU 内存占用:        {format_size(total_memory)}")
+    w(f"  ├─ 纹理内存:            {format_size(results['texture_memory'])} ({results['texture_count']} 个)")
+    w(f"  └─ Buffer 内存:         {format_size(results['buffer_memory'])} ({results['buffer_count']} 个)")
     
     if total_memory > 0:
         tex_ratio = results['texture_memory'] / total_memory * 100
         buf_ratio = results['buffer_memory'] / total_memory * 100
-        print(f"\n  内存分布: 纹理 {tex_ratio:.1f}% / Buffer {buf_ratio:.1f}%")
+        w(f"\n  内存分布: 纹理 {tex_ratio:.1f}% / Buffer {buf_ratio:.1f}%")
     
     # 按用途统计
-    print("\n" + "-" * 70)
-    print("                    📦 按用途分类")
-    print("-" * 70)
+    w("\n" + "-" * 70)
+    w("                    📦 按用途分类")
+    w("-" * 70)
     
     usage_stats = results['usage_stats']
     if usage_stats:
-        print(f"\n  {'用途':<20} {'数量':>10} {'大小':>15}")
-        print("  " + "-" * 50)
+        w(f"\n  {'用途':<20} {'数量':>10} {'大小':>15}")
+        w("  " + "-" * 50)
         for usage_type, stats in sorted(usage_stats.items(), key=lambda x: -x[1]['size']):
-            print(f"  {usage_type:<20} {stats['count']:>10} {format_size(stats['size']):>15}")
+            w(f"  {usage_type:<20} {stats['count']:>10} {format_size(stats['size']):>15}")
     
     # 按格式统计
-    print("\n" + "-" * 70)
-    print("                    🎨 按格式分类 (Top 15)")
-    print("-" * 70)
+    w("\n" + "-" * 70)
+    w("                    🎨 按格式分类 (Top 15)")
+    w("-" * 70)
     
     format_stats = results['format_stats']
     if format_stats:
-        print(f"\n  {'格式':<30} {'数量':>8} {'大小':>15}")
-        print("  " + "-" * 55)
-        sorted_formats = sorted(format_stats.items(), key=lambda x: -x[1]['size'])
-        for fmt_name, stats in sorted_formats[:15]:
+        w(f"\n  {'格式':<30} {'数量':>8} {'大小':>15}")
+        w("  " + "-" * 55)
+        for fmt_key, stats in heapq.nlargest(15, format_stats.items(), key=lambda x: x[1]['size']):
+            fmt_name = format_type_name(fmt_key)
             fmt_display = fmt_name[:28] + ".." if len(fmt_name) > 30 else fmt_name
-            print(f"  {fmt_display:<30} {stats['count']:>8} {format_size(stats['size']):>15}")
+            w(f"  {fmt_display:<30} {stats['count']:>8} {format_size(stats['size']):>15}")
     
     # 纹理尺寸分布
-    print("\n" + "-" * 70)
-    print("                    📐 纹理尺寸分布")
-    print("-" * 70)
+    w("\n" + "-" * 70)
+    w("                    📐 纹理尺寸分布")
+    w("-" * 70)
     
     dist = results['texture_size_distribution']
     if dist:
-        print(f"\n  {'尺寸范围':<20} {'数量':>10}")
-        print("  " + "-" * 35)
-        size_order = ['<= 64', '65 - 256', '257 - 512', '513 - 1024', '1025 - 2048', '> 2048']
-        for size_range in size_order:
+        w(f"\n  {'尺寸范围':<20} {'数量':>10}")
+        w("  " + "-" * 35)
+        for size_range in SIZE_BUCKET_LABELS:
             if size_range in dist:
-                print(f"  {size_range:<20} {dist[size_range]:>10}")
+                w(f"  {size_range:<20} {dist[size_range]:>10}")
     
     # 大纹理列表
     large_textures = results['large_textures']
     if large_textures:
-        print("\n" + "-" * 70)
-        print("                    ⚠️ 大纹理列表 (> 4MB)")
-        print("-" * 70)
+        w("\n" + "-" * 70)
+        w("                    ⚠️ 大纹理列表 (> 4MB)")
+        w("-" * 70)
         
-        print(f"\n  {'尺寸':<20} {'格式':<25} {'大小':>12}")
-        print("  " + "-" * 60)
+        w(f"\n  {'尺寸':<20} {'格式':<25} {'大小':>12}")
+        w("  " + "-" * 60)
         for tex in large_textures[:15]:
             dim_str = f"{tex['width']}x{tex['height']}"
             if tex['depth'] > 1:
@@ -361,13 +278,14 @@ def print_memory_report(results):
             if tex['mips'] > 1:
                 dim_str += f" ({tex['mips']}mip)"
             
-            fmt_display = tex['format'][:23] + ".." if len(tex['format']) > 25 else tex['format']
-            print(f"  {dim_str:<20} {fmt_display:<25} {format_size(tex['size']):>12}")
+            fmt_name = format_type_name(tex['format'])
+            fmt_display = fmt_name[:23] + ".." if len(fmt_name) > 25 else fmt_name
+            w(f"  {dim_str:<20} {fmt_display:<25} {format_size(tex['size']):>12}")
     
     # 优化建议
-    print("\n" + "=" * 70)
-    print("                       💡 内存优化建议")
-    print("=" * 70)
+    w("\n" + "=" * 70)
+    w("                       💡 内存优化建议")
+    w("=" * 70)
     
     suggestions = []
     
@@ -378,24 +296,34 @@ def print_memory_report(results):
         suggestions.append(f"  • 存在 {len(large_textures)} 个大纹理 (> 4MB)，检查是否可以降低分辨率")
     
     # 检查是否有非压缩格式
-    uncompressed_size = 0
-    for fmt_name, stats in format_stats.items():
-        fmt_lower = fmt_name.lower()
-        if 'bc' not in fmt_lower and 'astc' not in fmt_lower and 'etc' not in fmt_lower:
-            if 'r8g8b8a8' in fmt_lower or 'r16' in fmt_lower or 'r32' in fmt_lower:
-                uncompressed_size += stats['size']
-    
+    uncompressed_size = results['uncompressed_size']
     if uncompressed_size > 100 * 1024 * 1024:
         suggestions.append(f"  • 非压缩纹理占用 {format_size(uncompressed_size)}，考虑转换为压缩格式")
     
     if not suggestions:
-        print("  ✅ 内存使用情况良好，没有明显问题")
+        w("  ✅ 内存使用情况良好，没有明显问题")
     else:
         for s in suggestions:
-            print(s)
+            w(s)
+    
+    sys.stdout.write("\n".join(out) + "\n")
+
+
+def run_memory_analysis(controller):
+    """在已打开的 controller 上执行内存分析并打印报告"""
+    print("\n" + "=" * 70)
+    print("                    分析内存使用")
+    print("=" * 70)
+    results = analyze_memory_remote(controller)
+    print_memory_report(results)
+    return results
 
 
-def main():
+def main(controller=None):
+    """命令行入口；传入已打开的 controller 时直接分析，不再建立远程会话"""
+    if controller is not None:
+        return run_memory_analysis(controller)
+    
     parser = argparse.ArgumentParser(description='RenderDoc Android 内存分析')
     parser.add_argument('rdc_path', help='Android 设备上的 RDC 文件路径')
     parser.add_argument('--host', default=DEFAULT_HOST, help=f'远程服务器地址 (默认: {DEFAULT_HOST})')
@@ -408,28 +336,10 @@ def main():
     print("       RenderDoc Android 内存分析工具")
     print("=" * 70)
     
-    if not args.no_forward and args.host == "localhost":
-        setup_adb_port_forward()
-    
-    remote = connect_to_remote_server(args.host, args.port)
-    if remote is None:
-        sys.exit(1)
-    
-    controller = open_remote_capture(remote, args.rdc_path)
-    if controller is None:
-        remote.Shutdown()
-        sys.exit(1)
-    
-    try:
-        print("\n" + "=" * 70)
-        print("                    分析内存使用")
-        print("=" * 70)
-        results = analyze_memory_remote(controller)
-        print_memory_report(results)
-        
-    finally:
-        controller.Shutdown()
-        remote.Shutdown()
+    with RdcSession(args.rdc_path, args.host, args.port, forward=not args.no_forward) as controller:
+        if controller is None:
+            sys.exit(1)
+        run_memory_analysis(controller)
     
     print("\n" + "=" * 70)
     print("                         分析完成!")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+RenderDoc Android 内存 + 几何复杂度联合分析脚本
+
+用法: python analyze_memory_geometry_android.py <android_rdc_path> [--host <ip>] [--port <port>]
+
+功能:
+- 只建立一次远程连接、只打开一次捕获
+- 内存分析在后台线程与几何复杂度分析并行执行，共享同一个 ReplayController
+  （远程调用经 SerializedController 串行化），两份报告在分析结束后依次输出
+"""
+
+import sys
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from rdc_session import DEFAULT_HOST, DEFAULT_PORT, RdcSession, SerializedController
+from analyze_memory_android import analyze_memory_remote, print_memory_report
+from analyze_geometry_android import analyze_geometry_remote, print_geometry_report
+
+
+def run_parallel_analysis(controller, analyze_buffers=True):
+    """内存分析放到后台线程，几何复杂度分析在当前线程执行
+
+    内存分析只需 GetTextures/GetBuffers 两次调用，其余为本地计算；几何分析的
+    Action 树遍历同样不依赖当前事件，两者没有数据依赖，可以重叠执行。
+    """
+    shared = SerializedController(controller)
+    
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        memory_future = pool.submit(analyze_memory_remote, shared)
+        geometry_results = analyze_geometry_remote(shared, analyze_buffers=analyze_buffers)
+        memory_results = memory_future.result()
+    
+    # 分析过程中的进度输出可能交错，报告统一在结束后按顺序打印
+    print("\n" + "=" * 70)
+    print("                    分析内存使用")
+    print("=" * 70)
+    print_memory_report(memory_results)
+    
+    print("\n" + "=" * 70)
+    print("                    分析几何复杂度")
+    print("=" * 70)
+    print_geometry_report(geometry_results)
+    
+    return memory_results, geometry_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='RenderDoc Android 内存 + 几何复杂度联合分析')
+    parser.add_argument('rdc_path', help='Android 设备上的 RDC 文件路径')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'远程服务器地址 (默认: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'远程服务器端口 (默认: {DEFAULT_PORT})')
+    parser.add_argument('--no-forward', action='store_true', help='跳过 ADB 端口转发设置')
+    parser.add_argument('--skip-buffers', action='store_true',
+                        help='跳过 VB/IB 复用率统计（不查询 Buffer 使用记录，速度最快）')
+    
+    args = parser.parse_args()
+    
+    print("=" * 70)
+    print("       RenderDoc Android 内存 + 几何复杂度联合分析工具")
+    print("=" * 70)
+    
+    with RdcSession(args.rdc_path, args.host, args.port, forward=not args.no_forward) as controller:
+        if controller is None:
+            sys.exit(1)
+        run_parallel_analysis(controller, analyze_buffers=not args.skip_buffers)
+    
+    print("\n" + "=" * 70)
+    print("                         分析完成!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
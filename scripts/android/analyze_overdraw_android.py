@@ -13,19 +13,25 @@ RenderDoc Android Overdraw 分析脚本
 
 import sys
 import os
+import importlib.util
 import argparse
-from collections import defaultdict
+import heapq
+from array import array
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
 
-# 自动添加 RenderDoc Python 模块路径
+# 自动添加 RenderDoc Python 模块路径（renderdoc 已可导入时不探测目录、不修改 sys.path）
 RENDERDOC_MODULE_PATHS = [
     r"E:\code build\renderdoc-1.x\renderdoc-1.x\x64\Development\pymodules",
     r"E:\code build\RenderDoc_1.37_64",
     r"C:\Program Files\RenderDoc",
 ]
-for path in RENDERDOC_MODULE_PATHS:
-    if os.path.exists(path) and path not in sys.path:
-        sys.path.insert(0, path)
-        break
+if importlib.util.find_spec('renderdoc') is None:
+    for path in RENDERDOC_MODULE_PATHS:
+        if os.path.isdir(path):
+            sys.path.insert(0, path)
+            break
 
 import renderdoc as rd
 
@@ -111,48 +117,136 @@ def open_remote_capture(remote, rdc_path):
         return None
 
 
+# 热循环中用到的枚举值预先转成 int，避免每个 Action 都查 rd 模块属性
+_DRAW_FLAG = int(rd.ActionFlags.Drawcall)
+_PUSH_MARKER_FLAG = int(rd.ActionFlags.PushMarker)
+# 表示 RT 写入的 ResourceUsage（RenderTarget 在部分版本中不存在）
+_RT_USAGES = frozenset(
+    int(getattr(rd.ResourceUsage, name))
+    for name in ('ColorTarget', 'DepthStencilTarget', 'RenderTarget')
+    if hasattr(rd.ResourceUsage, name)
+)
+
+
+class _PassState:
+    """扫描过程中的当前 Pass；其 Drawcall 在按列存储的 Drawcall 统计中连续，从 first_draw 行开始"""
+    __slots__ = ('name', 'first_draw')
+    
+    def __init__(self, name, first_draw):
+        self.name = name
+        self.first_draw = first_draw
+
+
+# 每个三角形的平均覆盖像素数（估算用）
+AVG_TRIANGLE_COVERAGE = 500
+
+
+def estimate_draw_pixels(num_verts, instances, screen_pixels):
+    """估算 Drawcall 的像素量（instances 已经过 max(1, ...) 处理）
+    
+    num_verts <= 6 视为全屏绘制，结果为 screen_pixels；
+    否则为 min(三角形数 * 平均覆盖, screen_pixels * instances)。
+    """
+    if num_verts <= 6:
+        return screen_pixels
+    return min(num_verts // 3 * instances * AVG_TRIANGLE_COVERAGE, screen_pixels * instances)
+
+
+def estimate_pixels_column(num_verts, num_instances, screen_pixels):
+    """对整列 Drawcall 批量估算像素量，返回 array('q')（实例数 < 1 按 1 计）"""
+    return array('q', map(
+        estimate_draw_pixels,
+        num_verts,
+        map(max, num_instances, repeat(1)),
+        repeat(screen_pixels),
+    ))
+
+
+def collect_rt_usage(controller, resource_ids):
+    """逐个 RT 候选纹理查询使用记录，统计被作为 Color/Depth Target 写入的次数
+
+    返回 {str(resourceId): 写入次数}，只包含写入次数大于 0 的纹理。
+    """
+    rt_usage_count = {}
+    for resource_id in resource_ids:
+        try:
+            write_count = 0
+            for u in controller.GetUsage(resource_id):
+                if int(u.usage) in _RT_USAGES:
+                    write_count += 1
+            if write_count > 0:
+                rt_usage_count[str(resource_id)] = write_count
+        except Exception:
+            pass
+    return rt_usage_count
+
+
 def analyze_overdraw_remote(controller):
-    """分析 Overdraw 情况（远程版本）"""
+    """分析 Overdraw 情况（远程版本）
+
+    RT 使用统计（对 RT 候选纹理逐个 GetUsage）在后台线程中执行，与本地 Action 树的扫描重叠进行。
+    """
     
     # 统计变量
-    pass_draw_stats = []
-    rt_usage_count = defaultdict(int)
-    transparent_passes = []
-    fullscreen_draws = []
-    eid_overdraw_stats = []
+    # 每个 Pass 一行，按列存储；Overdraw 倍数 = pixels / total_screen_pixels。
+    # first_draw 为该 Pass 第一个 Drawcall 在 eid_overdraw_stats 中的行下标，
+    # drawcalls / pixels 在扫描结束后按行区间统一计算
+    pass_draw_stats = {
+        'name': [],
+        'first_draw': array('q'),
+    }
+    # 透明 Pass 在 pass_draw_stats 中的行下标
+    transparent_passes = array('i')
+    # 全屏绘制只记录 EID 及所在 Pass 在 pass_draw_stats 中的行下标，名称在输出时再生成
+    fullscreen_draws = {
+        'eid': array('q'),
+        'pass': array('i'),
+    }
+    # 每个 Drawcall 的统计按列存储，同一下标对应同一 Drawcall；
+    # pixels 列在扫描结束后批量估算，Overdraw 倍数 = pixels / total_screen_pixels，输出时再计算
+    draw_eids = array('q')
+    draw_verts = array('q')
+    draw_instances = array('q')
     
     # 获取帧信息来计算分辨率
     textures = controller.GetTextures()
-    rt_resolutions = {}
+    rt_resolutions = Counter()
     max_rt_width = 0
     max_rt_height = 0
-    
-    for tex in textures:
-        if hasattr(tex, 'creationFlags') and hasattr(rd, 'TextureCategory'):
-            if tex.creationFlags & rd.TextureCategory.ColorTarget:
-                res = (tex.width, tex.height)
-                rt_resolutions[res] = rt_resolutions.get(res, 0) + 1
-                if tex.width > max_rt_width:
-                    max_rt_width = tex.width
-                    max_rt_height = tex.height
+    # 只有创建时带 Color/Depth Target 标志的纹理才可能被写入，RT 使用统计只查询这些
+    rt_candidate_ids = []
+    
+    # creationFlags / TextureCategory 由 RenderDoc 版本决定，只探测一次；不支持时跳过 RT 统计
+    if textures and hasattr(rd, 'TextureCategory') and hasattr(textures[0], 'creationFlags'):
+        color_target = int(rd.TextureCategory.ColorTarget)
+        rt_categories = color_target | int(rd.TextureCategory.DepthTarget)
+        for tex in textures:
+            creation_flags = int(tex.creationFlags)
+            if creation_flags & rt_categories:
+                rt_candidate_ids.append(tex.resourceId)
+                if creation_flags & color_target:
+                    width = tex.width
+                    rt_resolutions[(width, tex.height)] += 1
+                    if width > max_rt_width:
+                        max_rt_width = width
+                        max_rt_height = tex.height
     
     # 找最常见的分辨率作为主屏幕
     main_screen_width = 1920
     main_screen_height = 1080
     
-    if rt_resolutions:
-        candidate_resolutions = [
-            (w, h, cnt) for (w, h), cnt in rt_resolutions.items() 
-            if w >= 256 and h >= 256 and w != h
-        ]
-        if candidate_resolutions:
-            candidate_resolutions.sort(key=lambda x: -x[2])
-            main_screen_width, main_screen_height, _ = candidate_resolutions[0]
-        else:
-            for (w, h), cnt in sorted(rt_resolutions.items(), key=lambda x: -x[1]):
-                if w <= 4096 and h <= 4096:
-                    main_screen_width, main_screen_height = w, h
-                    break
+    # 按出现次数从高到低：优先取 >= 256 的非正方形分辨率，
+    # 没有时退回到第一个不超过 4096 的分辨率
+    fallback_resolution = None
+    for (w, h), _ in rt_resolutions.most_common():
+        if w >= 256 and h >= 256 and w != h:
+            main_screen_width, main_screen_height = w, h
+            break
+        if fallback_resolution is None and w <= 4096 and h <= 4096:
+            fallback_resolution = (w, h)
+    else:
+        if fallback_resolution is not None:
+            main_screen_width, main_screen_height = fallback_resolution
     
     main_screen_pixels = main_screen_width * main_screen_height
     total_screen_pixels = main_screen_pixels
@@ -160,161 +254,155 @@ def analyze_overdraw_remote(controller):
     print(f"\n  检测到的最大 RT 分辨率: {max_rt_width} x {max_rt_height}")
     print(f"  使用主屏幕分辨率计算: {main_screen_width} x {main_screen_height}")
     
-    # Pass 分析
-    current_pass = {
-        'name': 'Root',
-        'drawcalls': 0,
-        'estimated_pixels': 0,
-        'rt_count': 0,
-        'has_blend': False,
-        'event_start': 0
-    }
+    # Pass 分析：遇到 Marker 时只记下该 Marker，等到其后第一个 Drawcall 才创建 Pass 统计，
+    # 不含 Drawcall 的 Marker（调试标记、Clear/Copy 区段等）不会产生任何分配
+    current_pass = None
+    pass_marker = None
     
-    def estimate_draw_pixels(action, screen_pixels):
-        """估算 Drawcall 的像素量"""
-        num_verts = action.numIndices if hasattr(action, 'numIndices') and action.numIndices > 0 else 0
-        if num_verts <= 6:
-            return screen_pixels  # 全屏
-        
-        instances = max(1, action.numInstances) if hasattr(action, 'numInstances') else 1
-        triangles = num_verts // 3 * instances
-        
-        avg_coverage = 500
-        return min(triangles * avg_coverage, screen_pixels * instances)
+    print("\n正在扫描所有 Action...", flush=True)
+    root_actions = controller.GetRootActions()
     
-    def process_action(action, depth=0):
-        """递归处理 Action"""
-        nonlocal current_pass
+    # RT 使用统计只涉及远程调用，放到后台线程；当前线程同时遍历本地 Action 树
+    # 遍历出错时 with 块也会等后台查询结束，之后调用方才可能关闭 controller
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        usage_future = pool.submit(collect_rt_usage, controller, rt_candidate_ids)
         
-        is_pass_marker = (action.flags & rd.ActionFlags.PushMarker) and action.children
+        # 显式栈做先序遍历（与原递归顺序一致），current_pass 直接在循环内更新，
+        # 离开 Marker 子树后不回退，保持原有的统计口径
+        has_num_indices = None
+        has_num_instances = None
         
-        if is_pass_marker:
-            # 保存上一个 Pass 的统计
-            if current_pass['drawcalls'] > 0:
-                overdraw = current_pass['estimated_pixels'] / total_screen_pixels if total_screen_pixels > 0 else 0
-                pass_draw_stats.append({
-                    'name': current_pass['name'],
-                    'drawcalls': current_pass['drawcalls'],
-                    'pixels': current_pass['estimated_pixels'],
-                    'overdraw': overdraw,
-                    'has_blend': current_pass['has_blend']
-                })
+        stack = list(reversed(root_actions))
+        while stack:
+            action = stack.pop()
+            flags = int(action.flags)
+            children = action.children
+            
+            if children:
+                if flags & _PUSH_MARKER_FLAG:
+                    # 保存上一个 Pass 的统计（已创建的 Pass 必然含有 Drawcall）
+                    if current_pass is not None:
+                        name_lower = current_pass.name.lower()
+                        if 'transparent' in name_lower or 'alpha' in name_lower:
+                            transparent_passes.append(len(pass_draw_stats['name']))
+                        
+                        pass_draw_stats['name'].append(current_pass.name)
+                        pass_draw_stats['first_draw'].append(current_pass.first_draw)
+                        current_pass = None
+                    
+                    # 新 Pass 延迟到第一个 Drawcall 时再创建
+                    pass_marker = action
                 
-                name_lower = current_pass['name'].lower()
-                if current_pass['has_blend'] or 'transparent' in name_lower or 'alpha' in name_lower:
-                    transparent_passes.append({
-                        'name': current_pass['name'],
-                        'drawcalls': current_pass['drawcalls'],
-                        'overdraw': overdraw
-                    })
+                stack.extend(reversed(children))
             
-            # 开始新 Pass
-            current_pass = {
-                'name': action.customName or f"Pass_{action.eventId}",
-                'drawcalls': 0,
-                'estimated_pixels': 0,
-                'rt_count': 0,
-                'has_blend': False,
-                'event_start': action.eventId
-            }
+            # 统计 Drawcall
+            if flags & _DRAW_FLAG:
+                if current_pass is None:
+                    if pass_marker is None:
+                        current_pass = _PassState('Root', len(draw_eids))
+                    else:
+                        current_pass = _PassState(
+                            pass_marker.customName or f"Pass_{pass_marker.eventId}", len(draw_eids)
+                        )
+                
+                # Action 的字段集合由 RenderDoc 版本决定，只在第一个 Drawcall 上探测一次
+                if has_num_indices is None:
+                    has_num_indices = hasattr(action, 'numIndices')
+                    has_num_instances = hasattr(action, 'numInstances')
+                
+                eid = action.eventId
+                num_verts = action.numIndices if has_num_indices else 0
+                num_instances = action.numInstances if has_num_instances else 1
+                
+                draw_eids.append(eid)
+                draw_verts.append(num_verts)
+                draw_instances.append(num_instances)
+                
+                if num_verts <= 6 and num_verts > 0:
+                    # 当前 Pass 已含 Drawcall，结束时必然写入下一行
+                    fullscreen_draws['eid'].append(eid)
+                    fullscreen_draws['pass'].append(len(pass_draw_stats['name']))
         
-        # 统计 Drawcall
-        if action.flags & rd.ActionFlags.Drawcall:
-            current_pass['drawcalls'] += 1
-            
-            pixels = estimate_draw_pixels(action, total_screen_pixels)
-            current_pass['estimated_pixels'] += pixels
-            
-            eid_overdraw = pixels / total_screen_pixels if total_screen_pixels > 0 else 0
-            eid_overdraw_stats.append({
-                'eid': action.eventId,
-                'name': action.customName or f"Draw_{action.eventId}",
-                'pass': current_pass['name'],
-                'pixels': pixels,
-                'overdraw': eid_overdraw,
-                'num_verts': action.numIndices if hasattr(action, 'numIndices') else 0,
-                'num_instances': action.numInstances if hasattr(action, 'numInstances') else 1
-            })
-            
-            num_verts = action.numIndices if hasattr(action, 'numIndices') else 0
-            if num_verts <= 6 and num_verts > 0:
-                fullscreen_draws.append({
-                    'name': action.customName or f"Draw_{action.eventId}",
-                    'event_id': action.eventId,
-                    'pass': current_pass['name']
-                })
+        # 保存最后一个 Pass
+        if current_pass is not None:
+            pass_draw_stats['name'].append(current_pass.name)
+            pass_draw_stats['first_draw'].append(current_pass.first_draw)
         
-        for child in action.children:
-            process_action(child, depth + 1)
-    
-    print("\n正在扫描所有 Action...", flush=True)
-    root_actions = controller.GetRootActions()
-    for action in root_actions:
-        process_action(action)
-    
-    # 保存最后一个 Pass
-    if current_pass['drawcalls'] > 0:
-        overdraw = current_pass['estimated_pixels'] / total_screen_pixels if total_screen_pixels > 0 else 0
-        pass_draw_stats.append({
-            'name': current_pass['name'],
-            'drawcalls': current_pass['drawcalls'],
-            'pixels': current_pass['estimated_pixels'],
-            'overdraw': overdraw,
-            'has_blend': current_pass['has_blend']
-        })
-    
-    # 分析 RT 使用情况
-    try:
-        resources = controller.GetResources()
-        for res in resources:
-            try:
-                usage = controller.GetUsage(res.resourceId)
-                write_count = 0
-                for u in usage:
-                    if u.usage in [rd.ResourceUsage.ColorTarget, rd.ResourceUsage.DepthStencilTarget,
-                                  rd.ResourceUsage.RenderTarget]:
-                        write_count += 1
-                if write_count > 0:
-                    rt_usage_count[str(res.resourceId)] = write_count
-            except:
-                pass
-    except:
-        pass
+        rt_usage_count = usage_future.result()
+    
+    # 扫描只收集原始列，像素量在这里整列估算；每个 Pass 的 Drawcall 是连续的行区间，
+    # 其 Drawcall 数与像素量直接由区间得出
+    draw_pixels = estimate_pixels_column(draw_verts, draw_instances, total_screen_pixels)
+    eid_overdraw_stats = {
+        'eid': draw_eids,
+        'pixels': draw_pixels,
+        'num_verts': draw_verts,
+        'num_instances': draw_instances,
+    }
+    bounds = pass_draw_stats['first_draw'].tolist()
+    bounds.append(len(draw_pixels))
+    pass_draw_stats['drawcalls'] = array('q', [end - start for start, end in zip(bounds, bounds[1:])])
+    pass_draw_stats['pixels'] = array('q', [sum(draw_pixels[start:end]) for start, end in zip(bounds, bounds[1:])])
+    
+    # 报告用到的汇总计数在这里一次算好，输出时不再遍历各列
+    high_overdraw_passes_count = 0
+    if total_screen_pixels > 0:
+        high_pass_pixels = 2 * total_screen_pixels
+        high_overdraw_passes_count = sum(1 for pixels in pass_draw_stats['pixels'] if pixels > high_pass_pixels)
+    pass_drawcalls = pass_draw_stats['drawcalls']
+    transparent_draws = sum(pass_drawcalls[i] for i in transparent_passes)
     
     return {
         'pass_draw_stats': pass_draw_stats,
-        'rt_usage_count': dict(rt_usage_count),
+        'rt_usage_count': rt_usage_count,
         'transparent_passes': transparent_passes,
         'fullscreen_draws': fullscreen_draws,
         'eid_overdraw_stats': eid_overdraw_stats,
         'main_screen_width': main_screen_width,
         'main_screen_height': main_screen_height,
-        'total_screen_pixels': total_screen_pixels
+        'total_screen_pixels': total_screen_pixels,
+        'total_draws': len(draw_eids),
+        'total_overdraw_pixels': sum(draw_pixels),
+        'high_overdraw_passes_count': high_overdraw_passes_count,
+        'transparent_count': len(transparent_passes),
+        'transparent_draws': transparent_draws,
+        'fullscreen_count': len(fullscreen_draws['eid']),
     }
 
 
 def print_overdraw_report(results):
     """打印 Overdraw 分析报告"""
+    
+    # 报告先缓存到列表，最后一次性写出
+    out = []
+    w = out.append
+    
     pass_draw_stats = results['pass_draw_stats']
-    transparent_passes = results['transparent_passes']
     fullscreen_draws = results['fullscreen_draws']
     eid_overdraw_stats = results['eid_overdraw_stats']
     rt_usage_count = results['rt_usage_count']
     total_screen_pixels = results['total_screen_pixels']
     
-    print("\n" + "=" * 70)
-    print("                      📊 Overdraw 分析总览")
-    print("=" * 70)
+    w("\n" + "=" * 70)
+    w("                      📊 Overdraw 分析总览")
+    w("=" * 70)
+    
+    pass_names = pass_draw_stats['name']
+    pass_drawcalls = pass_draw_stats['drawcalls']
+    pass_pixels = pass_draw_stats['pixels']
     
-    total_draws = sum(p['drawcalls'] for p in pass_draw_stats)
-    total_overdraw_pixels = sum(p['pixels'] for p in pass_draw_stats)
+    total_draws = results['total_draws']
+    total_overdraw_pixels = results['total_overdraw_pixels']
+    high_overdraw_passes = results['high_overdraw_passes_count']
+    transparent_count = results['transparent_count']
+    fullscreen_count = results['fullscreen_count']
     avg_overdraw = total_overdraw_pixels / total_screen_pixels if total_screen_pixels > 0 else 0
     
-    print(f"  主屏幕分辨率:           {results['main_screen_width']} x {results['main_screen_height']}")
-    print(f"  总 Drawcall 数:         {total_draws:,}")
-    print(f"  估算总像素写入量:       {total_overdraw_pixels:,}")
-    print(f"  屏幕像素数:             {total_screen_pixels:,}")
-    print(f"  平均 Overdraw 倍数:     {avg_overdraw:.2f}x")
+    w(f"  主屏幕分辨率:           {results['main_screen_width']} x {results['main_screen_height']}")
+    w(f"  总 Drawcall 数:         {total_draws:,}")
+    w(f"  估算总像素写入量:       {total_overdraw_pixels:,}")
+    w(f"  屏幕像素数:             {total_screen_pixels:,}")
+    w(f"  平均 Overdraw 倍数:     {avg_overdraw:.2f}x")
     
     # Overdraw 评级
     if avg_overdraw < 2:
@@ -325,95 +413,115 @@ def print_overdraw_report(results):
         rating = "⚠️ 一般"
     else:
         rating = "❌ 较差"
-    print(f"  Overdraw 评级:          {rating}")
-    
-    # 按 Overdraw 排序的 Pass
-    pass_draw_stats.sort(key=lambda x: x['overdraw'], reverse=True)
+    w(f"  Overdraw 评级:          {rating}")
     
-    print("\n" + "-" * 70)
-    print("                 🏆 Overdraw 最高的 Pass (Top 15)")
-    print("-" * 70)
-    print(f"  {'Pass 名称':<35} {'Drawcall':>10} {'Overdraw':>12}")
-    print("-" * 70)
-    for p in pass_draw_stats[:15]:
-        name = p['name'][:33] + ".." if len(p['name']) > 35 else p['name']
-        overdraw_str = f"{p['overdraw']:.2f}x"
-        print(f"  {name:<35} {p['drawcalls']:>10} {overdraw_str:>12}")
-    
-    # 按 EID 输出 Overdraw > 3x 的 Drawcall
-    high_overdraw_eids = [e for e in eid_overdraw_stats if e['overdraw'] > 3]
-    high_overdraw_eids.sort(key=lambda x: x['overdraw'], reverse=True)
-    
-    print("\n" + "-" * 70)
-    print("            🔥 Overdraw > 3x 的 Drawcall (按 EID)")
-    print("-" * 70)
+    # Overdraw 最高的 15 个 Pass（Overdraw 与像素量单调对应，按像素量取 Top 15）
+    if total_screen_pixels > 0:
+        top_passes = heapq.nlargest(15, range(len(pass_names)), key=pass_pixels.__getitem__)
+    else:
+        top_passes = range(min(15, len(pass_names)))
+    
+    w("\n" + "-" * 70)
+    w("                 🏆 Overdraw 最高的 Pass (Top 15)")
+    w("-" * 70)
+    w(f"  {'Pass 名称':<35} {'Drawcall':>10} {'Overdraw':>12}")
+    w("-" * 70)
+    for i in top_passes:
+        name = pass_names[i][:33] + ".." if len(pass_names[i]) > 35 else pass_names[i]
+        overdraw = pass_pixels[i] / total_screen_pixels if total_screen_pixels > 0 else 0
+        overdraw_str = f"{overdraw:.2f}x"
+        w(f"  {name:<35} {pass_drawcalls[i]:>10} {overdraw_str:>12}")
+    
+    # 按 EID 输出 Overdraw > 3x 的 Drawcall：只统计总数并取 Top 30 的行下标，
+    # 像素量与 Overdraw 倍数单调对应，直接按像素量比较
+    draw_pixels = eid_overdraw_stats['pixels']
+    high_overdraw_count = 0
+    high_overdraw_eids = []
+    if total_screen_pixels > 0:
+        high_pixels = 3 * total_screen_pixels
+        high_overdraw_count = sum(1 for pixels in draw_pixels if pixels > high_pixels)
+        if high_overdraw_count:
+            high_overdraw_eids = heapq.nlargest(
+                30,
+                (i for i, pixels in enumerate(draw_pixels) if pixels > high_pixels),
+                key=draw_pixels.__getitem__,
+            )
+    
+    w("\n" + "-" * 70)
+    w("            🔥 Overdraw > 3x 的 Drawcall (按 EID)")
+    w("-" * 70)
     
     if high_overdraw_eids:
-        print(f"  共发现 {len(high_overdraw_eids)} 个 Drawcall 的 Overdraw > 3x\n")
-        print(f"  {'EID':<10} {'Overdraw':>10} {'顶点数':>12} {'实例数':>10}")
-        print("  " + "-" * 50)
-        for e in high_overdraw_eids[:30]:
-            print(f"  {e['eid']:<10} {e['overdraw']:>9.2f}x {e['num_verts']:>12,} {e['num_instances']:>10,}")
+        w(f"  共发现 {high_overdraw_count} 个 Drawcall 的 Overdraw > 3x\n")
+        w(f"  {'EID':<10} {'Overdraw':>10} {'顶点数':>12} {'实例数':>10}")
+        w("  " + "-" * 50)
+        draw_eids = eid_overdraw_stats['eid']
+        draw_verts = eid_overdraw_stats['num_verts']
+        draw_instances = eid_overdraw_stats['num_instances']
+        for i in high_overdraw_eids:
+            overdraw = draw_pixels[i] / total_screen_pixels
+            w(f"  {draw_eids[i]:<10} {overdraw:>9.2f}x {draw_verts[i]:>12,} {draw_instances[i]:>10,}")
         
-        if len(high_overdraw_eids) > 30:
-            print(f"\n  ... 还有 {len(high_overdraw_eids) - 30} 个未显示")
+        if high_overdraw_count > 30:
+            w(f"\n  ... 还有 {high_overdraw_count - 30} 个未显示")
     else:
-        print("  ✅ 没有发现 Overdraw > 3x 的 Drawcall")
+        w("  ✅ 没有发现 Overdraw > 3x 的 Drawcall")
     
     # 透明 Pass 分析
-    if transparent_passes:
-        print("\n" + "-" * 70)
-        print("                    🔮 透明物体渲染分析")
-        print("-" * 70)
-        print(f"  透明 Pass 数量: {len(transparent_passes)}")
-        total_transparent_draws = sum(p['drawcalls'] for p in transparent_passes)
-        print(f"  透明 Drawcall 总数: {total_transparent_draws}")
+    if transparent_count:
+        w("\n" + "-" * 70)
+        w("                    🔮 透明物体渲染分析")
+        w("-" * 70)
+        w(f"  透明 Pass 数量: {transparent_count}")
+        total_transparent_draws = results['transparent_draws']
+        w(f"  透明 Drawcall 总数: {total_transparent_draws}")
         
         if total_draws > 0:
             transparent_ratio = total_transparent_draws / total_draws * 100
-            print(f"  透明 Drawcall 占比: {transparent_ratio:.1f}%")
+            w(f"  透明 Drawcall 占比: {transparent_ratio:.1f}%")
     
     # 全屏绘制分析
-    print("\n" + "-" * 70)
-    print("                    📺 全屏绘制分析")
-    print("-" * 70)
-    print(f"  全屏绘制次数: {len(fullscreen_draws)}")
+    w("\n" + "-" * 70)
+    w("                    📺 全屏绘制分析")
+    w("-" * 70)
+    w(f"  全屏绘制次数: {fullscreen_count}")
     
-    if len(fullscreen_draws) > 0:
+    if fullscreen_count > 0:
         fs_by_pass = defaultdict(int)
-        for fs in fullscreen_draws:
-            fs_by_pass[fs['pass']] += 1
+        for row in fullscreen_draws['pass']:
+            fs_by_pass[pass_names[row]] += 1
         
-        print("\n  按 Pass 分布 (Top 10):")
+        w("\n  按 Pass 分布 (Top 10):")
         for pass_name, count in sorted(fs_by_pass.items(), key=lambda x: -x[1])[:10]:
             name = pass_name[:40] + ".." if len(pass_name) > 42 else pass_name
-            print(f"    {name}: {count} 次")
+            w(f"    {name}: {count} 次")
     
     # 优化建议
-    print("\n" + "=" * 70)
-    print("                       💡 Overdraw 优化建议")
-    print("=" * 70)
+    w("\n" + "=" * 70)
+    w("                       💡 Overdraw 优化建议")
+    w("=" * 70)
     
     suggestions = []
     
     if avg_overdraw > 3:
         suggestions.append("  • 平均 Overdraw 较高，考虑实现深度预渲染 (Z-Prepass)")
     
-    if len(transparent_passes) > 10:
-        suggestions.append(f"  • 透明 Pass 较多 ({len(transparent_passes)} 个)，考虑合并透明批次")
+    if transparent_count > 10:
+        suggestions.append(f"  • 透明 Pass 较多 ({transparent_count} 个)，考虑合并透明批次")
     
-    if len(fullscreen_draws) > 20:
-        suggestions.append(f"  • 全屏绘制较多 ({len(fullscreen_draws)} 次)，考虑合并后处理 Pass")
+    if fullscreen_count > 20:
+        suggestions.append(f"  • 全屏绘制较多 ({fullscreen_count} 次)，考虑合并后处理 Pass")
     
-    high_overdraw_passes = [p for p in pass_draw_stats if p['overdraw'] > 2]
-    if len(high_overdraw_passes) > 5:
-        suggestions.append(f"  • {len(high_overdraw_passes)} 个 Pass 的 Overdraw > 2x，考虑启用遮挡剔除")
+    if high_overdraw_passes > 5:
+        suggestions.append(f"  • {high_overdraw_passes} 个 Pass 的 Overdraw > 2x，考虑启用遮挡剔除")
     
     if not suggestions:
-        print("  ✅ Overdraw 情况良好，没有明显问题")
+        w("  ✅ Overdraw 情况良好，没有明显问题")
     else:
         for s in suggestions:
-            print(s)
+            w(s)
+    
+    sys.stdout.write("\n".join(out) + "\n")
 
 
 def main():
@@ -14,7 +14,11 @@ RenderDoc Android Pass 依赖分析脚本
 import sys
 import os
 import argparse
+import json
+from array import array
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations, islice
 
 # 自动添加 RenderDoc Python 模块路径
 RENDERDOC_MODULE_PATHS = [
@@ -111,290 +115,508 @@ def open_remote_capture(remote, rdc_path):
         return None
 
 
-def analyze_pass_deps_remote(controller):
-    """分析 Pass 依赖关系（远程版本）"""
+def build_resource_mask(res_ids, resource_bits):
+    """把资源集合转换为整数位集；resource_bits 为资源 ID → 位下标，遇到新资源时追加"""
+    mask = 0
+    for res_id in res_ids:
+        bit = resource_bits.get(res_id)
+        if bit is None:
+            bit = resource_bits[res_id] = len(resource_bits)
+        mask |= 1 << bit
+    return mask
+
+
+# 报告中最多列出的可并行 Pass 对数
+MAX_PARALLEL_PAIRS = 50
+
+# 热循环中用到的枚举值预先取出，避免每个 Action / Drawcall 都查 rd 模块属性
+_DRAW_FLAG = int(rd.ActionFlags.Drawcall)
+_PUSH_MARKER_FLAG = int(rd.ActionFlags.PushMarker)
+_POP_MARKER_FLAG = int(rd.ActionFlags.PopMarker)
+_NULL_RESOURCE = rd.ResourceId.Null()
+_NULL_RESOURCE_ID = int(_NULL_RESOURCE)
+# 查询只读资源 (SRV) 的着色器阶段
+_SRV_STAGES = (rd.ShaderStage.Vertex, rd.ShaderStage.Pixel, rd.ShaderStage.Compute)
+
+
+def pass_display_name(name, eid):
+    """Pass 的显示名称：Marker 未命名时用 Pass_<EID>"""
+    return name or f"Pass_{eid}"
+
+
+class PassInfo:
+    """遍历 Action 树时正在收集的 Pass；name 为 Marker 的原始名称（可能为空），Drawcall 数即 len(draw_eids)"""
+    __slots__ = ('name', 'eid', 'draw_eids')
+    
+    def __init__(self, name, eid):
+        self.name = name
+        self.eid = eid
+        self.draw_eids = []
+
+
+def sample_pass_draws(draw_eids):
+    """从一个 Pass 的 Drawcall EID 列表中取出需要查询管线状态的采样：第一个和中间的 Drawcall"""
+    if len(draw_eids) <= 2:
+        return draw_eids
+    return [draw_eids[0], draw_eids[len(draw_eids) // 2]]
+
+
+def get_srv_resources(pipe):
+    """收集当前管线各阶段绑定的 SRV，返回 int(ResourceId) 集合（不含空资源）"""
+    srvs = {int(res.descriptor.resource) for stage in _SRV_STAGES for res in pipe.GetReadOnlyResources(stage)}
+    srvs.discard(_NULL_RESOURCE_ID)
+    return srvs
+
+
+def fetch_draw_targets(controller, eid):
+    """切换到指定 Drawcall，返回 (写入的 RT 集合, 读取的资源集合)
+
+    资源以 ResourceId 的整数句柄表示，集合运算与哈希都比 str(ResourceId) 快。
+    查询中途出错时返回已收集到的部分。
+    """
+    writes = set()
+    reads = set()
+    
+    try:
+        controller.SetFrameEvent(eid, False)
+        pipe = controller.GetPipelineState()
+        
+        # 写入：Color Target 与 Depth Target。RenderDoc 1.32 起返回 Descriptor (.resource)，
+        # 之前为 BoundResource (.resourceId)，同一次查询返回的对象类型一致，只需判断一次
+        targets = list(pipe.GetOutputTargets())
+        targets.append(pipe.GetDepthTarget())
+        id_attr = 'resourceId' if hasattr(targets[0], 'resourceId') else 'resource'
+        for target in targets:
+            res_id = getattr(target, id_attr)
+            if res_id != _NULL_RESOURCE:
+                writes.add(int(res_id))
+        
+        # 读取：各阶段绑定的 SRV
+        reads = get_srv_resources(pipe)
+    except Exception:
+        pass
+    
+    return writes, reads
+
+
+def fetch_pass_targets(controller, pass_eids):
+    """依次查询每个 Pass 的 Drawcall，返回每个 Pass 的 (写入集合, 读取集合) 列表"""
+    pass_targets = []
+    for eids in pass_eids:
+        writes = set()
+        reads = set()
+        for eid in eids:
+            draw_writes, draw_reads = fetch_draw_targets(controller, eid)
+            writes |= draw_writes
+            reads |= draw_reads
+        pass_targets.append((writes, reads))
+    return pass_targets
+
+
+def find_redundant_switches(write_masks, read_masks):
+    """返回可能冗余的 Pass 切换：第 i 个 Pass 与前一个写入相同的非空 RT 集合，
+    且不读取前一个 Pass 写入的资源（没有依赖，可能可以合并）。返回满足条件的 i 列表。
+    """
+    rows = []
+    for i in range(1, len(write_masks)):
+        prev_writes = write_masks[i-1]
+        if prev_writes and prev_writes == write_masks[i] and not read_masks[i] & prev_writes:
+            rows.append(i)
+    return rows
+
+
+def find_live_passes(write_masks, read_masks):
+    """反向剔除，返回对最终输出（最后一个 Pass 写入的资源）有贡献的 Pass 行下标（升序）
+
+    最后一个 Pass 没有写入任何资源时无法确定最终输出，不做剔除。
+    """
+    pass_count = len(write_masks)
+    if not pass_count or not write_masks[-1]:
+        return list(range(pass_count))
+    
+    live_rows = []
+    live_mask = write_masks[-1]
+    for i in range(pass_count - 1, -1, -1):
+        if write_masks[i] & live_mask:
+            live_rows.append(i)
+            live_mask |= read_masks[i]
+    live_rows.reverse()
+    return live_rows
+
+
+def compute_pass_levels(rows, pass_writes, pass_reads):
+    """按 RAW/WAW/WAR 依赖为 Pass 分层，返回 {行下标: 层号}
+
+    依赖边：资源的上一个写入者 → 读取者 (RAW)、上一个写入者 → 下一个写入者 (WAW)、
+    上次写入后的读取者 → 下一个写入者 (WAR)。rows 为提交顺序（本身就是拓扑序），
+    因此 Kahn 算法退化为一次正向扫描：层号 = 所有前驱层号的最大值 + 1，复杂度 O(N + E)。
+    """
+    last_writer = {}
+    readers_since_write = defaultdict(list)
+    levels = {}
+    
+    for i in rows:
+        level = 0
+        for res_id in pass_reads[i]:
+            writer = last_writer.get(res_id)
+            if writer is not None and writer != i and levels[writer] >= level:
+                level = levels[writer] + 1
+        
+        for res_id in pass_writes[i]:
+            writer = last_writer.get(res_id)
+            if writer is not None and writer != i and levels[writer] >= level:
+                level = levels[writer] + 1
+            for reader in readers_since_write[res_id]:
+                if reader != i and levels[reader] >= level:
+                    level = levels[reader] + 1
+        
+        levels[i] = level
+        for res_id in pass_writes[i]:
+            last_writer[res_id] = i
+            readers_since_write[res_id] = []
+        for res_id in pass_reads[i]:
+            readers_since_write[res_id].append(i)
+    
+    return levels
+
+
+def analyze_pass_deps_remote(controller, sample_draws=True, extra_controllers=()):
+    """分析 Pass 依赖关系（远程版本）
+
+    RT 读写信息需要逐个 Drawcall 切换事件查询，是远程分析的主要耗时。sample_draws 为
+    True 时每个 Pass 只查询第一个和中间的 Drawcall；为 False 时查询全部 Drawcall。
+    extra_controllers 为同一捕获的其他 ReplayController（各自独立的远程连接），
+    传入时管线状态查询按 Pass 分块在多个连接上并行进行。
+    """
     
     print("\n正在分析 Pass 依赖关系...", flush=True)
     
-    # 收集 Pass 信息
-    passes = []  # {name, eid, writes: set(), reads: set(), drawcalls}
+    # Pass 信息按列存储，同一下标对应同一 Pass，以 eid 标识；name 为原始 Marker 名称，
+    # 显示名称在输出时才生成（见 pass_display_name）；writes / reads 为资源集合，
+    # n_writes / n_reads 为集合大小，write_mask / read_mask 为对应的整数位集（见 build_resource_mask）
+    passes = {
+        'name': [],
+        'eid': array('q'),
+        'drawcalls': array('q'),
+        'writes': [],
+        'reads': [],
+    }
+    pass_names = passes['name']
+    pass_eids = passes['eid']
+    pass_writes = passes['writes']
+    pass_reads = passes['reads']
+    # 每个 Pass 需要查询管线状态的 Drawcall EID
+    sample_eids = []
     current_pass = None
     
-    # RT 使用记录
-    rt_first_write = {}  # resource_id -> pass_name
-    rt_last_write = {}   # resource_id -> pass_name
-    rt_reads = defaultdict(list)  # resource_id -> [pass_name]
-    
     # 依赖关系
-    dependencies = []  # (from_pass, to_pass, resource_id, type)
+    dependencies = []  # (from_eid, to_eid, int(ResourceId), type)
+    
+    def save_pass(pass_info):
+        pass_names.append(pass_info.name)
+        pass_eids.append(pass_info.eid)
+        passes['drawcalls'].append(len(pass_info.draw_eids))
+        draw_eids = pass_info.draw_eids
+        # 同一 Pass 内的 Drawcall 通常绑定相同的 RT，采样时只查询第一个和中间的 Drawcall
+        sample_eids.append(sample_pass_draws(draw_eids) if sample_draws else draw_eids)
+    
+    # 遍历 Action 树时只记录每个 Pass 的 Drawcall EID，不做远程调用；
+    # 管线状态查询在遍历结束后按 Pass 顺序统一进行。
+    # 显式栈做先序遍历（与递归顺序一致），深层 Action 树不会触发递归深度限制
+    root_actions = controller.GetRootActions()
     
-    def process_action(action, depth=0):
-        nonlocal current_pass
+    stack = list(reversed(root_actions))
+    while stack:
+        action = stack.pop()
+        flags = int(action.flags)
         
         # 检测 Pass 标记
-        if action.flags & rd.ActionFlags.PushMarker:
-            if current_pass and current_pass['drawcalls'] > 0:
-                passes.append(current_pass)
+        if flags & _PUSH_MARKER_FLAG:
+            if current_pass and current_pass.draw_eids:
+                save_pass(current_pass)
             
-            current_pass = {
-                'name': action.customName or f"Pass_{action.eventId}",
-                'eid': action.eventId,
-                'writes': set(),
-                'reads': set(),
-                'drawcalls': 0
-            }
+            current_pass = PassInfo(action.customName, action.eventId)
+        elif flags & _POP_MARKER_FLAG:
+            # Marker 结束：保存当前 Pass，直到下一个 Marker 之前的 Drawcall 不属于任何 Pass
+            if current_pass and current_pass.draw_eids:
+                save_pass(current_pass)
+            current_pass = None
         
-        # 统计 Drawcall 并收集 RT 读写信息
-        if action.flags & rd.ActionFlags.Drawcall:
-            if current_pass:
-                current_pass['drawcalls'] += 1
-            
-            try:
-                controller.SetFrameEvent(action.eventId, False)
-                pipe = controller.GetPipelineState()
-                
-                # 获取当前绑定的 RT (写入)
-                try:
-                    outputs = pipe.GetOutputTargets()
-                    for out in outputs:
-                        if hasattr(out, 'resourceId') and out.resourceId != rd.ResourceId.Null():
-                            res_id = str(out.resourceId)
-                            if current_pass:
-                                current_pass['writes'].add(res_id)
-                except:
-                    pass
-                
-                # 获取 Depth Target (写入)
-                try:
-                    depth_target = pipe.GetDepthTarget()
-                    if hasattr(depth_target, 'resourceId') and depth_target.resourceId != rd.ResourceId.Null():
-                        res_id = str(depth_target.resourceId)
-                        if current_pass:
-                            current_pass['writes'].add(res_id)
-                except:
-                    pass
-                
-                # 获取 SRV (读取)
-                for stage in [rd.ShaderStage.Vertex, rd.ShaderStage.Pixel, rd.ShaderStage.Compute]:
-                    try:
-                        resources = pipe.GetReadOnlyResources(stage)
-                        for res in resources:
-                            if hasattr(res, 'descriptor'):
-                                res_id = res.descriptor.resource
-                                if res_id != rd.ResourceId.Null():
-                                    if current_pass:
-                                        current_pass['reads'].add(str(res_id))
-                    except:
-                        pass
-                
-            except:
-                pass
+        # 统计 Drawcall；不属于任何 Pass 的 Drawcall 结果不会被使用，无需查询
+        if flags & _DRAW_FLAG and current_pass is not None:
+            current_pass.draw_eids.append(action.eventId)
         
-        for child in action.children:
-            process_action(child, depth + 1)
-    
-    root_actions = controller.GetRootActions()
-    for action in root_actions:
-        process_action(action)
+        stack.extend(reversed(action.children))
     
     # 保存最后一个 Pass
-    if current_pass and current_pass['drawcalls'] > 0:
-        passes.append(current_pass)
+    if current_pass and current_pass.draw_eids:
+        save_pass(current_pass)
+    
+    pass_count = len(pass_names)
+    print(f"  共识别 {pass_count} 个 Pass", flush=True)
     
-    print(f"  共识别 {len(passes)} 个 Pass", flush=True)
+    # 收集 RT 读写信息
+    total_samples = sum(len(eids) for eids in sample_eids)
+    print(f"  查询 {total_samples} 个 Drawcall 的管线状态...", flush=True)
     
-    # 分析依赖关系
-    for i, pass_info in enumerate(passes):
+    controllers = [controller]
+    controllers.extend(extra_controllers)
+    if len(controllers) == 1 or pass_count < 2:
+        pass_targets = fetch_pass_targets(controller, sample_eids)
+    else:
+        # 按 Pass 顺序切成连续的块，每个 controller 处理一块（块内事件仍按顺序前进）
+        chunk_size = -(-pass_count // len(controllers))
+        chunks = [sample_eids[start:start + chunk_size] for start in range(0, pass_count, chunk_size)]
+        print(f"  使用 {len(chunks)} 个远程连接并行查询", flush=True)
+        with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+            pass_targets = []
+            for chunk_targets in pool.map(fetch_pass_targets, controllers, chunks):
+                pass_targets.extend(chunk_targets)
+    
+    for writes, reads in pass_targets:
+        pass_writes.append(writes)
+        pass_reads.append(reads)
+    
+    # 每个 Pass 读写的资源数，报告直接使用
+    passes['n_writes'] = array('q', map(len, pass_writes))
+    passes['n_reads'] = array('q', map(len, pass_reads))
+    
+    # 每个资源分配一个位下标，Pass 的读写集合压成整数位集，后续集合运算只做整数位运算
+    resource_bits = {}
+    write_masks = passes['write_mask'] = [build_resource_mask(w, resource_bits) for w in pass_writes]
+    read_masks = passes['read_mask'] = [build_resource_mask(r, resource_bits) for r in pass_reads]
+    
+    # 分析依赖关系：按资源位下标记录首次 / 最近一次写入它的 Pass 行号（-1 表示尚未写入）
+    resource_count = len(resource_bits)
+    first_write = array('q', [-1]) * resource_count
+    last_write = array('q', [-1]) * resource_count
+    for i in range(pass_count):
         # 记录写入
-        for res_id in pass_info['writes']:
-            if res_id not in rt_first_write:
-                rt_first_write[res_id] = pass_info['name']
-            rt_last_write[res_id] = pass_info['name']
+        for res_id in pass_writes[i]:
+            bit = resource_bits[res_id]
+            if first_write[bit] < 0:
+                first_write[bit] = i
+            last_write[bit] = i
         
         # 检查读取依赖
-        for res_id in pass_info['reads']:
-            if res_id in rt_last_write:
-                writer = rt_last_write[res_id]
-                if writer != pass_info['name']:
-                    dependencies.append({
-                        'from': writer,
-                        'to': pass_info['name'],
-                        'resource': res_id,
-                        'type': 'read_after_write'
-                    })
-            
-            rt_reads[res_id].append(pass_info['name'])
-    
-    # 检测冗余 Pass 切换
-    redundant_switches = []
-    for i in range(1, len(passes)):
-        prev_pass = passes[i-1]
-        curr_pass = passes[i]
-        
-        # 如果写入相同的 RT 集合且没有依赖，可能可以合并
-        if prev_pass['writes'] == curr_pass['writes'] and len(prev_pass['writes']) > 0:
-            # 检查是否有依赖
-            has_dep = False
-            for res_id in curr_pass['reads']:
-                if res_id in prev_pass['writes']:
-                    has_dep = True
-                    break
-            
-            if not has_dep:
-                redundant_switches.append({
-                    'pass1': prev_pass['name'],
-                    'pass2': curr_pass['name'],
-                    'shared_rts': list(prev_pass['writes'])
+        for res_id in pass_reads[i]:
+            writer = last_write[resource_bits[res_id]]
+            if writer >= 0 and writer != i:
+                dependencies.append({
+                    'from': pass_eids[writer],
+                    'to': pass_eids[i],
+                    'resource': res_id,
+                    'type': 'read_after_write'
                 })
     
-    # 找出没有依赖可以并行的 Pass
-    parallelizable = []
-    for i in range(len(passes)):
-        for j in range(i + 1, len(passes)):
-            pass_i = passes[i]
-            pass_j = passes[j]
-            
-            # 检查是否有 RAW/WAW/WAR 依赖
-            has_conflict = False
-            
-            # RAW: j reads what i writes
-            if pass_i['writes'] & pass_j['reads']:
-                has_conflict = True
-            
-            # WAW: both write to same
-            if pass_i['writes'] & pass_j['writes']:
-                has_conflict = True
-            
-            # WAR: j writes what i reads
-            if pass_i['reads'] & pass_j['writes']:
-                has_conflict = True
-            
-            if not has_conflict:
-                parallelizable.append({
-                    'pass1': pass_i['name'],
-                    'pass2': pass_j['name']
-                })
+    # int(ResourceId) -> 首次写入它的 Pass EID（按首次写入顺序）
+    rt_first_write = {res_id: pass_eids[first_write[bit]]
+                      for res_id, bit in resource_bits.items() if first_write[bit] >= 0}
+    
+    # 检测冗余 Pass 切换：在位集上找出行下标，只为结果组装字典
+    redundant_switches = [
+        {
+            'pass1': pass_eids[i-1],
+            'pass2': pass_eids[i],
+            'shared_rts': list(pass_writes[i-1])
+        }
+        for i in find_redundant_switches(write_masks, read_masks)
+    ]
+    
+    # 反向剔除：从最后一个 Pass 的输出出发逆序传播，写入了仍被需要的资源的 Pass 才对最终画面
+    # 有贡献，其读取的资源随之变为需要。其余 Pass 的输出从未被使用，不参与可并行分析
+    live_rows = find_live_passes(write_masks, read_masks)
+    
+    # 找出没有依赖可以并行的 Pass：按 RAW/WAW/WAR 建立依赖图并分层，
+    # 有冲突的两个 Pass 之间必有依赖路径，同一层内的 Pass 两两可并行
+    levels = compute_pass_levels(live_rows, pass_writes, pass_reads)
+    by_level = defaultdict(list)
+    for i in live_rows:
+        by_level[levels[i]].append(i)
+    
+    # 只生成报告需要的前 MAX_PARALLEL_PAIRS 对，不枚举全部组合
+    level_pairs = (pair for level in sorted(by_level) for pair in combinations(by_level[level], 2))
+    parallelizable = [
+        {'pass1': pass_eids[i], 'pass2': pass_eids[j]}
+        for i, j in islice(level_pairs, MAX_PARALLEL_PAIRS)
+    ]
     
     return {
         'passes': passes,
         'dependencies': dependencies,
         'redundant_switches': redundant_switches,
-        'parallelizable': parallelizable[:50],  # 限制数量
+        'parallelizable': parallelizable,
+        'dead_pass_count': pass_count - len(live_rows),
+        'level_count': len(by_level),
         'rt_first_write': rt_first_write,
-        'rt_usage_count': len(rt_reads)
+        # 被读取或写入过的资源总数（每个资源恰好占一个位下标）
+        'rt_usage_count': resource_count
     }
 
 
 def print_pass_deps_report(results):
     """打印 Pass 依赖分析报告"""
     
-    print("\n" + "=" * 70)
-    print("                      📊 Pass 依赖分析总览")
-    print("=" * 70)
+    # 报告先缓存到列表，最后一次性写出
+    out = []
+    w = out.append
+    
+    w("\n" + "=" * 70)
+    w("                      📊 Pass 依赖分析总览")
+    w("=" * 70)
     
     passes = results['passes']
     dependencies = results['dependencies']
+    pass_names = passes['name']
+    pass_eids = passes['eid']
+    pass_drawcalls = passes['drawcalls']
+    pass_n_writes = passes['n_writes']
+    pass_n_reads = passes['n_reads']
+    redundant = results['redundant_switches']
+    parallelizable = results['parallelizable']
+    dead_pass_count = results['dead_pass_count']
+    
+    # 各处反复用到的数量只计算一次
+    pass_count = len(pass_names)
+    dep_count = len(dependencies)
+    redundant_count = len(redundant)
+    parallel_count = len(parallelizable)
+    
+    # 依赖、冗余切换、可并行结果中的 Pass 以 EID 标识，输出时再换成显示名称
+    name_by_eid = dict(zip(pass_eids, pass_names))
     
-    print(f"\n  总 Pass 数量:           {len(passes)}")
-    print(f"  依赖关系数量:           {len(dependencies)}")
-    print(f"  涉及 RT 数量:           {results['rt_usage_count']}")
+    def label(eid):
+        return pass_display_name(name_by_eid[eid], eid)
     
-    total_draws = sum(p['drawcalls'] for p in passes)
-    print(f"  总 Drawcall 数量:       {total_draws}")
+    w(f"\n  总 Pass 数量:           {pass_count}")
+    w(f"  依赖关系数量:           {dep_count}")
+    w(f"  涉及 RT 数量:           {results['rt_usage_count']}")
+    # 读取集合来自采样的 Drawcall，且跨帧使用的资源 (TAA 历史、阴影缓存等) 也会计入，仅供参考
+    w(f"  本帧内输出未被读取的 Pass (采样): {dead_pass_count}")
+    w(f"  依赖层级数:             {results['level_count']}")
     
-    if len(passes) > 0:
-        avg_draws = total_draws / len(passes)
-        print(f"  平均每 Pass Drawcall:   {avg_draws:.1f}")
+    total_draws = sum(pass_drawcalls)
+    w(f"  总 Drawcall 数量:       {total_draws}")
+    
+    if pass_count:
+        avg_draws = total_draws / pass_count
+        w(f"  平均每 Pass Drawcall:   {avg_draws:.1f}")
     
     # Pass 列表
-    print("\n" + "-" * 70)
-    print("                    📋 Pass 列表")
-    print("-" * 70)
+    w("\n" + "-" * 70)
+    w("                    📋 Pass 列表")
+    w("-" * 70)
     
-    print(f"\n  {'Pass 名称':<35} {'Drawcall':>10} {'写入 RT':>8} {'读取 RT':>8}")
-    print("  " + "-" * 65)
+    w(f"\n  {'Pass 名称':<35} {'Drawcall':>10} {'写入 RT':>8} {'读取 RT':>8}")
+    w("  " + "-" * 65)
     
-    for p in passes[:20]:
-        name = p['name'][:33] + ".." if len(p['name']) > 35 else p['name']
-        print(f"  {name:<35} {p['drawcalls']:>10} {len(p['writes']):>8} {len(p['reads']):>8}")
+    for i in range(min(20, pass_count)):
+        name = pass_display_name(pass_names[i], pass_eids[i])
+        name = name[:33] + ".." if len(name) > 35 else name
+        w(f"  {name:<35} {pass_drawcalls[i]:>10} {pass_n_writes[i]:>8} {pass_n_reads[i]:>8}")
     
-    if len(passes) > 20:
-        print(f"\n  ... 还有 {len(passes) - 20} 个未显示")
+    if pass_count > 20:
+        w(f"\n  ... 还有 {pass_count - 20} 个未显示")
     
     # 依赖关系
     if dependencies:
-        print("\n" + "-" * 70)
-        print("                    🔗 依赖关系 (Top 20)")
-        print("-" * 70)
+        w("\n" + "-" * 70)
+        w("                    🔗 依赖关系 (Top 20)")
+        w("-" * 70)
         
-        print(f"\n  {'源 Pass':<25} → {'目标 Pass':<25} {'类型'}")
-        print("  " + "-" * 65)
+        w(f"\n  {'源 Pass':<25} → {'目标 Pass':<25} {'类型'}")
+        w("  " + "-" * 65)
         
         for dep in dependencies[:20]:
-            from_name = dep['from'][:23] + ".." if len(dep['from']) > 25 else dep['from']
-            to_name = dep['to'][:23] + ".." if len(dep['to']) > 25 else dep['to']
-            print(f"  {from_name:<25} → {to_name:<25} RAW")
+            from_name = label(dep['from'])
+            to_name = label(dep['to'])
+            from_name = from_name[:23] + ".." if len(from_name) > 25 else from_name
+            to_name = to_name[:23] + ".." if len(to_name) > 25 else to_name
+            w(f"  {from_name:<25} → {to_name:<25} RAW")
         
-        if len(dependencies) > 20:
-            print(f"\n  ... 还有 {len(dependencies) - 20} 个未显示")
+        if dep_count > 20:
+            w(f"\n  ... 还有 {dep_count - 20} 个未显示")
     
     # 冗余 Pass 切换
-    redundant = results['redundant_switches']
     if redundant:
-        print("\n" + "-" * 70)
-        print("                ⚠️ 可能冗余的 Pass 切换")
-        print("-" * 70)
+        w("\n" + "-" * 70)
+        w("                ⚠️ 可能冗余的 Pass 切换")
+        w("-" * 70)
         
-        print(f"\n  共发现 {len(redundant)} 对可能冗余的 Pass 切换\n")
+        w(f"\n  共发现 {redundant_count} 对可能冗余的 Pass 切换\n")
         
         for r in redundant[:10]:
-            p1 = r['pass1'][:30] + ".." if len(r['pass1']) > 32 else r['pass1']
-            p2 = r['pass2'][:30] + ".." if len(r['pass2']) > 32 else r['pass2']
-            print(f"  • {p1}")
-            print(f"    → {p2}")
-            print(f"    共享 RT: {len(r['shared_rts'])} 个\n")
+            p1 = label(r['pass1'])
+            p2 = label(r['pass2'])
+            p1 = p1[:30] + ".." if len(p1) > 32 else p1
+            p2 = p2[:30] + ".." if len(p2) > 32 else p2
+            w(f"  • {p1}")
+            w(f"    → {p2}")
+            w(f"    共享 RT: {len(r['shared_rts'])} 个\n")
     else:
-        print("\n  ✅ 未发现明显冗余的 Pass 切换")
+        w("\n  ✅ 未发现明显冗余的 Pass 切换")
     
     # 可并行的 Pass
-    parallelizable = results['parallelizable']
     if parallelizable:
-        print("\n" + "-" * 70)
-        print("                🚀 可并行的 Pass 对 (部分)")
-        print("-" * 70)
+        w("\n" + "-" * 70)
+        w("                🚀 可并行的 Pass 对 (部分)")
+        w("-" * 70)
         
-        print(f"\n  共发现 {len(parallelizable)} 对可并行的 Pass\n")
+        w(f"\n  共发现 {parallel_count} 对可并行的 Pass\n")
         
         for p in parallelizable[:10]:
-            p1 = p['pass1'][:25] + ".." if len(p['pass1']) > 27 else p['pass1']
-            p2 = p['pass2'][:25] + ".." if len(p['pass2']) > 27 else p['pass2']
-            print(f"  • {p1} || {p2}")
+            p1 = label(p['pass1'])
+            p2 = label(p['pass2'])
+            p1 = p1[:25] + ".." if len(p1) > 27 else p1
+            p2 = p2[:25] + ".." if len(p2) > 27 else p2
+            w(f"  • {p1} || {p2}")
     
     # 优化建议
-    print("\n" + "=" * 70)
-    print("                       💡 Pass 优化建议")
-    print("=" * 70)
+    w("\n" + "=" * 70)
+    w("                       💡 Pass 优化建议")
+    w("=" * 70)
     
     suggestions = []
     
-    if len(redundant) > 5:
-        suggestions.append(f"  • 存在 {len(redundant)} 对冗余 Pass 切换，考虑合并相同 RT 的 Pass")
+    if redundant_count > 5:
+        suggestions.append(f"  • 存在 {redundant_count} 对冗余 Pass 切换，考虑合并相同 RT 的 Pass")
     
-    if len(passes) > 50:
-        suggestions.append(f"  • Pass 数量较多 ({len(passes)})，检查是否可以减少 RT 切换")
+    if pass_count > 50:
+        suggestions.append(f"  • Pass 数量较多 ({pass_count})，检查是否可以减少 RT 切换")
     
-    avg_deps = len(dependencies) / len(passes) if len(passes) > 0 else 0
+    avg_deps = dep_count / pass_count if pass_count else 0
     if avg_deps > 3:
         suggestions.append(f"  • 平均依赖较多 ({avg_deps:.1f}/Pass)，检查资源生命周期")
     
-    if len(parallelizable) > 10:
-        suggestions.append(f"  • 存在 {len(parallelizable)} 对可并行 Pass，考虑异步计算优化")
+    if parallel_count > 10:
+        suggestions.append(f"  • 存在 {parallel_count} 对可并行 Pass，考虑异步计算优化")
     
     if not suggestions:
-        print("  ✅ Pass 依赖情况良好，没有明显问题")
+        w("  ✅ Pass 依赖情况良好，没有明显问题")
     else:
         for s in suggestions:
-            print(s)
+            w(s)
+    
+    sys.stdout.write("\n".join(out) + "\n")
+
+
+def _json_default(obj):
+    """json 序列化补充：集合转为排序后的列表，array 转为列表"""
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    if isinstance(obj, array):
+        return obj.tolist()
+    raise TypeError(f"无法序列化的类型: {type(obj).__name__}")
+
+
+def export_results_json(results, json_path):
+    """把分析结果导出为 JSON，供 CI / 看板等程序读取（内部使用的位集列不导出）"""
+    passes = {key: column for key, column in results['passes'].items()
+              if key not in ('write_mask', 'read_mask')}
+    data = dict(results, passes=passes)
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, default=_json_default)
+    print(f"\n✅ 分析结果已导出: {json_path}")
 
 
 def main():
@@ -403,6 +625,11 @@ def main():
     parser.add_argument('--host', default=DEFAULT_HOST, help=f'远程服务器地址 (默认: {DEFAULT_HOST})')
     parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'远程服务器端口 (默认: {DEFAULT_PORT})')
     parser.add_argument('--no-forward', action='store_true', help='跳过 ADB 端口转发设置')
+    parser.add_argument('--all-draws', action='store_true',
+                        help='查询每个 Drawcall 的管线状态（默认每个 Pass 只采样第一个和中间的 Drawcall）')
+    parser.add_argument('--parallel', type=int, default=1, metavar='N',
+                        help='建立 N 个远程连接并行查询管线状态（需要远程服务器接受多个连接，默认: 1）')
+    parser.add_argument('--json', metavar='JSON_PATH', help='同时把分析结果导出为 JSON 文件')
     
     args = parser.parse_args()
     
@@ -422,14 +649,37 @@ def main():
         remote.Shutdown()
         sys.exit(1)
     
+    # 额外的连接各自打开一份捕获；建立失败时按已有的连接数继续
+    extra_sessions = []
+    for _ in range(args.parallel - 1):
+        extra_remote = connect_to_remote_server(args.host, args.port)
+        if extra_remote is None:
+            break
+        extra_controller = open_remote_capture(extra_remote, args.rdc_path)
+        if extra_controller is None:
+            extra_remote.Shutdown()
+            break
+        extra_sessions.append((extra_remote, extra_controller))
+    if len(extra_sessions) < args.parallel - 1:
+        print(f"⚠️ 只建立了 {len(extra_sessions) + 1} 个远程连接，按此并行度继续")
+    
     try:
         print("\n" + "=" * 70)
         print("                    分析 Pass 依赖")
         print("=" * 70)
-        results = analyze_pass_deps_remote(controller)
+        results = analyze_pass_deps_remote(
+            controller,
+            sample_draws=not args.all_draws,
+            extra_controllers=[c for _, c in extra_sessions],
+        )
         print_pass_deps_report(results)
+        if args.json:
+            export_results_json(results, args.json)
         
     finally:
+        for extra_remote, extra_controller in extra_sessions:
+            extra_controller.Shutdown()
+            extra_remote.Shutdown()
         controller.Shutdown()
         remote.Shutdown()
     
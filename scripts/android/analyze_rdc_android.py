@@ -23,7 +23,14 @@ RenderDoc Android 综合分析入口脚本
 import sys
 import os
 import argparse
+import queue
+import re
+import threading
 import time
+from collections import Counter, namedtuple
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from datetime import datetime
 
 # 自动添加 RenderDoc Python 模块路径
@@ -45,6 +52,43 @@ DEFAULT_PORT = 38920
 # RenderDoc GUI 通常使用这个转发端口
 RENDERDOC_GUI_PORT = 38960
 
+# 预取线程最多领先主线程的 Drawcall 数
+PREFETCH_QUEUE_SIZE = 8
+# 预取线程队列满时等待的间隔（秒），超时后检查是否已被要求停止
+PREFETCH_PUT_TIMEOUT = 0.1
+
+# 遍历热路径中用到的枚举值，模块加载时绑定一次
+_DRAW_FLAG = int(rd.ActionFlags.Drawcall)
+_DISPATCH_FLAG = int(rd.ActionFlags.Dispatch)
+_PUSH_MARKER_FLAG = int(rd.ActionFlags.PushMarker)
+
+# 块压缩纹理格式（BC / ETC / ASTC），内存估算按每像素 1 字节计
+_BLOCK_COMPRESSED_TYPES = frozenset(
+    getattr(rd.ResourceFormatType, name)
+    for name in ('BC1', 'BC2', 'BC3', 'BC4', 'BC5', 'BC6', 'BC7', 'ETC2', 'EAC', 'ASTC')
+    if hasattr(rd.ResourceFormatType, name)
+)
+
+# 资源绑定分析检查的 Shader 阶段，(VS, FS, CS) 组合同时作为管线缓存的键
+_BINDING_STAGES = (rd.ShaderStage.Vertex, rd.ShaderStage.Fragment, rd.ShaderStage.Compute)
+
+# /proc/net/unix 中 RenderDoc 的 abstract socket 名称 (格式: @renderdoc_XXXXX)
+_SOCK_RE = re.compile(r'@(renderdoc_\S+)')
+
+# 平均 Overdraw 评级表：(上限, 评级)，取第一个满足 avg < 上限 的评级
+_OVERDRAW_RATINGS = (
+    (2, "✅ 优秀"),
+    (3, "👍 良好"),
+    (5, "⚠️ 一般"),
+    (float('inf'), "❌ 较差"),
+)
+
+# D3D 语义名拆分为基名 + 末尾数字索引，例如 TEXCOORD12 -> ("TEXCOORD", "12")
+_SEMANTIC_RE = re.compile(r'^(.*?)(\d*)$')
+
+# 展平后的 Action 列表（均为先序遍历顺序），各项分析共用，Action 树只遍历一次
+FrameActions = namedtuple('FrameActions', 'draws dispatches markers')
+
 
 def format_size(size_bytes):
     """格式化字节大小"""
@@ -72,26 +116,26 @@ def setup_adb_port_forward():
     """设置 ADB 端口转发 - 自动检测 RenderDoc socket 名称"""
     import subprocess
     try:
-        # 首先清除旧的转发
-        subprocess.run(["adb", "forward", "--remove-all"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        
-        # 查找 RenderDoc 的 abstract socket 名称
-        result = subprocess.run(
-            ["adb", "shell", "cat /proc/net/unix | grep renderdoc"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-        output = result.stdout.decode() if result.stdout else ''
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            # 清除旧的转发与查找 socket 互不依赖，两次 ADB 往返并行执行
+            remove_future = pool.submit(
+                subprocess.run, ["adb", "forward", "--remove-all"],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+            
+            # 直接读取 /proc/net/unix，在本地过滤，不在设备上起 shell 管道
+            result = subprocess.run(
+                ["adb", "shell", "cat", "/proc/net/unix"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE
+            )
+            # 新的转发必须在清除完成之后建立
+            remove_future.result()
+        output = result.stdout.decode(errors='replace') if result.stdout else ''
         
         # 解析 socket 名称 (格式: @renderdoc_XXXXX)
-        socket_name = None
-        for line in output.split('\n'):
-            if '@renderdoc_' in line:
-                # 提取 socket 名称
-                parts = line.split('@')
-                if len(parts) >= 2:
-                    socket_name = parts[-1].strip()
-                    break
+        m = _SOCK_RE.search(output)
+        socket_name = m.group(1) if m else None
         
         if not socket_name:
             print("⚠️ 未找到 RenderDoc socket，请确保 Android 上已启动 RenderDoc Replay Server")
@@ -214,74 +258,127 @@ def open_remote_capture(remote, rdc_path):
 # ============ 分析模块导入 ============
 # 这里直接内嵌简化版的分析逻辑，避免模块导入问题
 
-def analyze_basic_stats(controller):
-    """基础统计分析"""
-    from collections import defaultdict
-    
-    total_draws = 0
-    total_dispatches = 0
-    pass_count = 0
-    
-    def process_action(action):
-        nonlocal total_draws, total_dispatches, pass_count
+def detect_main_resolution(textures):
+    """从 Color Target 中推测主屏幕分辨率，找不到时默认 1920x1080"""
+    if hasattr(rd, 'TextureCategory'):
+        for tex in textures:
+            if hasattr(tex, 'creationFlags'):
+                if tex.creationFlags & rd.TextureCategory.ColorTarget:
+                    if tex.width > 256 and tex.height > 256 and tex.width != tex.height:
+                        return tex.width, tex.height
+    return 1920, 1080
+
+
+def collect_actions(root_actions):
+    """显式栈先序遍历 Action 树，一次收集 Drawcall / Dispatch / PushMarker 列表（不产生回放调用）"""
+    draws = []
+    dispatches = []
+    markers = []
+    
+    stack = list(reversed(root_actions))
+    while stack:
+        action = stack.pop()
         
-        if action.flags & rd.ActionFlags.Drawcall:
-            total_draws += 1
-        if action.flags & rd.ActionFlags.Dispatch:
-            total_dispatches += 1
-        if action.flags & rd.ActionFlags.PushMarker:
-            pass_count += 1
+        flags = int(action.flags)
+        if flags & _DRAW_FLAG:
+            draws.append(action)
+        if flags & _DISPATCH_FLAG:
+            dispatches.append(action)
+        if flags & _PUSH_MARKER_FLAG:
+            markers.append(action)
         
-        for child in action.children:
-            process_action(child)
+        children = action.children
+        if children:
+            stack.extend(reversed(children))
     
-    root_actions = controller.GetRootActions()
-    for action in root_actions:
-        process_action(action)
+    return FrameActions(draws, dispatches, markers)
+
+
+def analyze_all(controller, actions, basic=True, overdraw=True, geometry=True):
+    """基于展平的 Action 列表同时完成基础统计、Overdraw 与几何复杂度分析
     
-    textures = controller.GetTextures()
-    buffers = controller.GetBuffers()
+    三项分析都只读取 Drawcall 自身的 numIndices / numInstances，
+    所有计数在同一次循环中累加。actions 为 collect_actions 的结果。
+    返回 {'basic': ..., 'overdraw': ..., 'geometry': ...}，只包含启用的分析。
+    """
+    textures = controller.GetTextures() if (basic or overdraw) else []
     
-    return {
-        'total_draws': total_draws,
-        'total_dispatches': total_dispatches,
-        'pass_count': pass_count,
-        'texture_count': len(textures),
-        'buffer_count': len(buffers)
-    }
+    # 获取分辨率
+    main_width, main_height = detect_main_resolution(textures) if overdraw else (1920, 1080)
+    screen_pixels = main_width * main_height
+    
+    total_draws = len(actions.draws)
+    total_pixels = 0
+    total_triangles = 0
+    total_instances = 0
+    
+    for action in actions.draws:
+        num_indices = action.numIndices if hasattr(action, 'numIndices') else 0
+        num_instances = max(1, action.numInstances) if hasattr(action, 'numInstances') else 1
+        
+        triangles = num_indices // 3 * num_instances
+        total_triangles += triangles
+        total_instances += num_instances
+        
+        if num_indices <= 6:
+            total_pixels += screen_pixels
+        else:
+            total_pixels += min(triangles * 500, screen_pixels * num_instances)
+    
+    results = {}
+    if basic:
+        results['basic'] = {
+            'total_draws': total_draws,
+            'total_dispatches': len(actions.dispatches),
+            'pass_count': len(actions.markers),
+            'texture_count': len(textures),
+            'buffer_count': len(controller.GetBuffers())
+        }
+    if overdraw:
+        results['overdraw'] = {
+            'screen_resolution': f"{main_width}x{main_height}",
+            'total_draws': total_draws,
+            'avg_overdraw': total_pixels / screen_pixels if screen_pixels > 0 else 0
+        }
+    if geometry:
+        results['geometry'] = {
+            'total_draws': total_draws,
+            'total_triangles': total_triangles,
+            'total_instances': total_instances,
+            'avg_triangles_per_draw': total_triangles // total_draws if total_draws > 0 else 0
+        }
+    return results
+
+
+def get_texture_bytes_per_pixel(fmt):
+    """估算纹理每像素字节数：块压缩格式 1，RGBA16 / RGBA32 为 8 / 16，其余按 4 计"""
+    if fmt.type in _BLOCK_COMPRESSED_TYPES:
+        return 1
+    if fmt.type == rd.ResourceFormatType.Regular and fmt.compCount == 4 and fmt.compByteWidth in (2, 4):
+        return 4 * fmt.compByteWidth
+    return 4
 
 
 def analyze_memory(controller):
     """内存分析"""
-    texture_memory = 0
-    buffer_memory = 0
-    
     textures = controller.GetTextures()
-    for tex in textures:
-        # 简化的大小估算
-        width = tex.width
-        height = max(1, tex.height)
-        depth = max(1, tex.depth)
-        mips = max(1, tex.mips)
-        array_size = max(1, tex.arraysize)
-        
-        bytes_per_pixel = 4  # 默认
-        fmt_str = str(tex.format).lower()
-        if 'bc' in fmt_str or 'astc' in fmt_str or 'etc' in fmt_str:
-            bytes_per_pixel = 1
-        elif 'r16g16b16a16' in fmt_str:
-            bytes_per_pixel = 8
-        elif 'r32g32b32a32' in fmt_str:
-            bytes_per_pixel = 16
-        
+    
+    # 简化的大小估算只取决于 (尺寸, 数组大小, 是否有 Mipmap, 每像素字节数)，
+    # 先按这组参数给纹理计数，每种组合只计算一次大小
+    shape_counts = Counter(
+        (tex.width, max(1, tex.height), max(1, tex.depth), max(1, tex.arraysize),
+         tex.mips > 1, get_texture_bytes_per_pixel(tex.format))
+        for tex in textures
+    )
+    
+    texture_memory = 0
+    for (width, height, depth, array_size, has_mips, bytes_per_pixel), count in shape_counts.items():
         size = width * height * depth * bytes_per_pixel * array_size
         # Mipmap 系数
-        size = int(size * (1 + 1/3) if mips > 1 else size)
-        texture_memory += size
+        size = int(size * (1 + 1/3) if has_mips else size)
+        texture_memory += size * count
     
-    buffers = controller.GetBuffers()
-    for buf in buffers:
-        buffer_memory += buf.length
+    buffer_memory = sum(buf.length for buf in controller.GetBuffers())
     
     return {
         'texture_memory': texture_memory,
@@ -290,471 +387,501 @@ def analyze_memory(controller):
     }
 
 
-def analyze_overdraw(controller):
-    """Overdraw 分析"""
-    from collections import defaultdict
+def prefetch_draw_states(controller, draw_actions, fetch_state):
+    """依次切换到每个 Drawcall，按顺序产出 (action, fetch_state(pipe))
     
-    # 获取分辨率
-    textures = controller.GetTextures()
-    main_width = 1920
-    main_height = 1080
+    SetFrameEvent / GetPipelineState 在预取线程中提交，最多领先消费方
+    PREFETCH_QUEUE_SIZE 个事件，回放往返与主线程的分析计算相互重叠。
+    RenderDoc 的 ReplayController 不是线程安全的，所有 controller 调用都只在预取线程中发生；
+    PipeState 会随下一次 SetFrameEvent 变化，fetch_state 需在预取线程中取出分析要用的数据。
+    
+    消费方出错或提前关闭生成器时，预取线程会在下一个事件前停止，并在返回前 join，
+    保证调用方之后再使用（或 Shutdown）controller 时没有进行中的回放调用。
+    """
+    completion_queue = queue.Queue(maxsize=PREFETCH_QUEUE_SIZE)
+    stop_event = threading.Event()
     
-    for tex in textures:
-        if hasattr(tex, 'creationFlags') and hasattr(rd, 'TextureCategory'):
-            if tex.creationFlags & rd.TextureCategory.ColorTarget:
-                if tex.width > 256 and tex.height > 256 and tex.width != tex.height:
-                    main_width = tex.width
-                    main_height = tex.height
-                    break
+    def put(item):
+        """放入完成队列；被要求停止时放弃并返回 False"""
+        while not stop_event.is_set():
+            try:
+                completion_queue.put(item, timeout=PREFETCH_PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                pass
+        return False
     
-    screen_pixels = main_width * main_height
-    total_pixels = 0
-    total_draws = 0
+    def prefetch_worker():
+        try:
+            for action in draw_actions:
+                if stop_event.is_set():
+                    return
+                controller.SetFrameEvent(action.eventId, False)
+                pipe = controller.GetPipelineState()
+                if not put((action, fetch_state(pipe))):
+                    return
+        except Exception as e:
+            put(e)
+            return
+        put(None)
     
-    def process_action(action):
-        nonlocal total_pixels, total_draws
-        
-        if action.flags & rd.ActionFlags.Drawcall:
-            total_draws += 1
-            num_verts = action.numIndices if hasattr(action, 'numIndices') else 0
-            instances = max(1, action.numInstances) if hasattr(action, 'numInstances') else 1
-            
-            if num_verts <= 6:
-                pixels = screen_pixels
-            else:
-                triangles = num_verts // 3 * instances
-                pixels = min(triangles * 500, screen_pixels * instances)
-            
-            total_pixels += pixels
-        
-        for child in action.children:
-            process_action(child)
+    worker = threading.Thread(target=prefetch_worker, daemon=True)
+    worker.start()
     
-    root_actions = controller.GetRootActions()
-    for action in root_actions:
-        process_action(action)
+    try:
+        while True:
+            item = completion_queue.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop_event.set()
+        # 清空队列，让阻塞在 put 上的预取线程立即返回
+        while True:
+            try:
+                completion_queue.get_nowait()
+            except queue.Empty:
+                break
+        worker.join()
+
+
+def get_format_byte_size(fmt):
+    """估算格式的字节大小（分量数 × 分量字节宽度）"""
+    if fmt.compByteWidth:
+        return fmt.compCount * fmt.compByteWidth
+    return 4
+
+
+@lru_cache(maxsize=None)
+def parse_semantic_key(attr_name):
+    """顶点输入名转为语义键（大写基名 + 索引），例如 texcoord01 -> TEXCOORD1"""
+    m = _SEMANTIC_RE.match(attr_name)
+    semantic_index = int(m.group(2)) if m.group(2) else 0
+    return "{}{}".format(m.group(1).upper(), semantic_index)
+
+
+def get_shader_reflection(pipe, stage, shader, refl_cache):
+    """反射只取决于 Shader 本身，按 (stage, shader_id) 缓存，同一 Shader 只查询一次"""
+    key = (int(stage), shader)
+    if key not in refl_cache:
+        refl_cache[key] = pipe.GetShaderReflection(stage)
+    return refl_cache[key]
+
+
+def fetch_vertex_state(pipe, refl_cache):
+    """在预取线程中取出顶点属性分析所需数据：(VS ID, VS 反射, IA 顶点输入)，没有 VS 时为 (None, None, None)"""
+    vs_shader = pipe.GetShader(rd.ShaderStage.Vertex)
+    if vs_shader == rd.ResourceId.Null():
+        return None, None, None
     
-    avg_overdraw = total_pixels / screen_pixels if screen_pixels > 0 else 0
+    vs_refl = get_shader_reflection(pipe, rd.ShaderStage.Vertex, vs_shader, refl_cache)
+    if vs_refl is None:
+        return None, None, None
     
-    return {
-        'screen_resolution': f"{main_width}x{main_height}",
-        'total_draws': total_draws,
-        'avg_overdraw': avg_overdraw
-    }
+    # 获取 IA 下发的顶点输入
+    try:
+        vertex_inputs = pipe.GetVertexInputs()
+    except:
+        vertex_inputs = []
+    
+    return vs_shader, vs_refl, vertex_inputs
 
 
-def analyze_geometry(controller):
-    """几何复杂度分析"""
-    total_draws = 0
-    total_triangles = 0
-    total_instances = 0
+def get_unused_binds(mapping, attr):
+    """返回绑定映射中 Shader 未使用、但分配了绑定点的 bind 列表"""
+    binds = getattr(mapping, attr, None)
+    if binds is None:
+        return []
     
-    def process_action(action):
-        nonlocal total_draws, total_triangles, total_instances
-        
-        if action.flags & rd.ActionFlags.Drawcall:
-            total_draws += 1
-            num_indices = action.numIndices if hasattr(action, 'numIndices') else 0
-            num_instances = max(1, action.numInstances) if hasattr(action, 'numInstances') else 1
-            
-            triangles = num_indices // 3 * num_instances
-            total_triangles += triangles
-            total_instances += num_instances
-        
-        for child in action.children:
-            process_action(child)
+    try:
+        # 常规情况下每个 Bindpoint 都有 used / bind，直接属性访问
+        return [bp.bind for bp in binds if not bp.used and bp.bind >= 0]
+    except AttributeError:
+        pass
+    
+    # 旧版本或过期绑定缺少字段时逐项检查
+    unused = []
+    for bp in binds:
+        if hasattr(bp, 'used') and not bp.used:
+            if hasattr(bp, 'bind') and bp.bind >= 0:
+                unused.append(bp.bind)
+    return unused
+
+
+def extract_vertex_input(attr):
+    """直接属性访问取出顶点输入的 (location, name, format)"""
+    return attr.location, attr.name, attr.format
+
+
+def extract_vertex_input_checked(attr, unnamed=None):
+    """防御性地取出 (location, name, format)，缺少 name 时使用 unnamed（None 表示 loc_N）"""
+    location = getattr(attr, 'location', -1)
+    name = getattr(attr, 'name', None)
+    if name is None:
+        name = 'loc_{}'.format(location) if unnamed is None else unnamed
+    return location, name, getattr(attr, 'format', None)
+
+
+def get_stage_unused_binds(pipe, stage, shader, refl_cache):
+    """取出单个 Shader 阶段未使用的 (SRV, CBV, UAV) 绑定点列表，无法分析时返回 None"""
+    refl = get_shader_reflection(pipe, stage, shader, refl_cache)
+    if refl is None:
+        return None
     
-    root_actions = controller.GetRootActions()
-    for action in root_actions:
-        process_action(action)
+    try:
+        mapping = pipe.GetBindpointMapping(stage)
+    except:
+        return None
     
-    return {
-        'total_draws': total_draws,
-        'total_triangles': total_triangles,
-        'total_instances': total_instances,
-        'avg_triangles_per_draw': total_triangles // total_draws if total_draws > 0 else 0
-    }
+    # 只读资源 (SRV/Textures)、常量缓冲区 (CBV)、读写资源 (UAV)
+    return (
+        get_unused_binds(mapping, 'readOnlyResources'),
+        get_unused_binds(mapping, 'constantBlocks'),
+        get_unused_binds(mapping, 'readWriteResources'),
+    )
 
 
-def get_format_byte_size(fmt):
-    """估算格式的字节大小"""
-    fmt_str = str(fmt).lower()
-    
-    if 'r32g32b32a32' in fmt_str:
-        return 16
-    elif 'r32g32b32' in fmt_str:
-        return 12
-    elif 'r32g32' in fmt_str:
-        return 8
-    elif 'r32' in fmt_str:
-        return 4
-    elif 'r16g16b16a16' in fmt_str:
-        return 8
-    elif 'r16g16' in fmt_str:
-        return 4
-    elif 'r16' in fmt_str:
-        return 2
-    elif 'r8g8b8a8' in fmt_str:
-        return 4
-    elif 'r8g8' in fmt_str:
-        return 2
-    elif 'r8' in fmt_str:
-        return 1
-    else:
-        return 4  # 默认假设 4 字节
+def fetch_binding_state(pipe, refl_cache, binding_cache, pipeline_cache):
+    """在预取线程中取出当前管线所有阶段合并后未使用的 (SRV, CBV, UAV) 绑定点列表
+    
+    绑定点的使用情况只由 Shader 组合决定：合并结果按 (VS, FS, CS) 缓存在 pipeline_cache 中，
+    复用同一组 Shader 的 Drawcall 直接取缓存；单阶段结果按 (stage, shader_id) 缓存在 binding_cache 中，
+    同一 Shader 的 GetBindpointMapping 只调用一次，无法分析的阶段缓存为 None。
+    """
+    shaders = tuple(pipe.GetShader(stage) for stage in _BINDING_STAGES)
+    merged = pipeline_cache.get(shaders)
+    if merged is not None:
+        return merged
+    
+    srv, cbv, uav = [], [], []
+    null_id = rd.ResourceId.Null()
+    for stage, shader in zip(_BINDING_STAGES, shaders):
+        if shader == null_id:
+            continue
+        
+        key = (int(stage), shader)
+        if key not in binding_cache:
+            binding_cache[key] = get_stage_unused_binds(pipe, stage, shader, refl_cache)
+        
+        stage_unused = binding_cache[key]
+        if stage_unused is not None:
+            srv.extend(stage_unused[0])
+            cbv.extend(stage_unused[1])
+            uav.extend(stage_unused[2])
+    
+    merged = pipeline_cache[shaders] = (srv, cbv, uav)
+    return merged
 
 
-def analyze_vertex_attributes(controller):
-    """顶点属性浪费分析
+def analyze_per_draw(controller, draw_actions, vertex=True, bindings=True):
+    """单次遍历所有 Drawcall，同时完成顶点属性浪费与 Shader 资源绑定分析
     
-    检测 IA 下发但 Shader 未使用的顶点属性。
+    每个 Drawcall 只调用一次 SetFrameEvent + GetPipelineState，两项分析共享同一份管线状态。
+    
+    顶点属性：检测 IA 下发但 Shader 未使用的顶点属性。
     
     匹配策略:
     - Vulkan: 使用 Location 匹配 (regIndex vs location)
     - OpenGL/GLES: 使用 Location 匹配 (regIndex vs location)  
     - D3D11/D3D12: 使用语义名称匹配 (semanticName + semanticIndex)
+    
+    返回 {'vertex': ..., 'bindings': ...}，只包含启用的分析。
     """
     from collections import defaultdict
     
-    # 获取 API 类型
-    api_props = controller.GetAPIProperties()
-    api_type = api_props.pipelineType
-    
-    # 判断使用哪种匹配方式
-    is_vulkan = (api_type == rd.GraphicsAPI.Vulkan)
-    is_opengl = (api_type == rd.GraphicsAPI.OpenGL)
-    use_location_matching = is_vulkan or is_opengl  # Vulkan 和 OpenGL 使用 Location 匹配
-    
-    api_name = "Vulkan" if is_vulkan else ("OpenGL/GLES" if is_opengl else "D3D")
-    print("    检测到 API: {} (使用{}匹配)".format(
-        api_name, "Location" if use_location_matching else "语义名称"))
+    use_location_matching = False
+    if vertex:
+        # 获取 API 类型
+        api_props = controller.GetAPIProperties()
+        api_type = api_props.pipelineType
+        
+        # 判断使用哪种匹配方式
+        is_vulkan = (api_type == rd.GraphicsAPI.Vulkan)
+        is_opengl = (api_type == rd.GraphicsAPI.OpenGL)
+        use_location_matching = is_vulkan or is_opengl  # Vulkan 和 OpenGL 使用 Location 匹配
+        
+        api_name = "Vulkan" if is_vulkan else ("OpenGL/GLES" if is_opengl else "D3D")
+        print("    检测到 API: {} (使用{}匹配)".format(
+            api_name, "Location" if use_location_matching else "语义名称"))
     
-    total_draws = 0
+    # 顶点属性统计
     draws_with_waste = 0
     total_wasted_bytes = 0
     total_vertices = 0
     attr_stats = defaultdict(lambda: {'provided': 0, 'used': 0, 'wasted': 0})
     waste_details = []
     
-    def process_action(action):
-        nonlocal total_draws, draws_with_waste, total_wasted_bytes, total_vertices
-        
-        if action.flags & rd.ActionFlags.Drawcall:
-            total_draws += 1
-            
-            controller.SetFrameEvent(action.eventId, False)
-            pipe = controller.GetPipelineState()
-            
-            vs_shader = pipe.GetShader(rd.ShaderStage.Vertex)
-            if vs_shader == rd.ResourceId.Null():
-                for child in action.children:
-                    process_action(child)
-                return
-            
-            vs_refl = pipe.GetShaderReflection(rd.ShaderStage.Vertex)
-            if vs_refl is None:
-                for child in action.children:
-                    process_action(child)
-                return
-            
-            # 根据 API 类型选择匹配方式
-            if use_location_matching:
-                # Vulkan / OpenGL: 使用 Location 匹配
-                shader_locations = set()
-                for sig in vs_refl.inputSignature:
-                    # regIndex 对应 Vulkan 的 Location
-                    loc = getattr(sig, 'regIndex', -1)
-                    if loc >= 0:
-                        shader_locations.add(loc)
-                
-                # 获取 IA 下发的顶点输入
-                try:
-                    vertex_inputs = pipe.GetVertexInputs()
-                except:
-                    vertex_inputs = []
-                
-                if not vertex_inputs:
-                    for child in action.children:
-                        process_action(child)
-                    return
-                
-                # 检查浪费
-                wasted_attrs = []
-                wasted_bytes_per_vertex = 0
-                
-                for attr in vertex_inputs:
-                    attr_location = getattr(attr, 'location', -1)
-                    attr_name = getattr(attr, 'name', 'loc_{}'.format(attr_location))
-                    
-                    fmt = getattr(attr, 'format', None)
-                    byte_size = get_format_byte_size(fmt) if fmt else 4
-                    
-                    attr_stats[attr_name]['provided'] += 1
-                    
-                    # 检查该 location 是否被 Shader 使用
-                    if attr_location >= 0 and attr_location not in shader_locations:
-                        wasted_attrs.append({
-                            'name': attr_name,
-                            'location': attr_location,
-                            'size': byte_size
-                        })
-                        wasted_bytes_per_vertex += byte_size
-                        attr_stats[attr_name]['wasted'] += 1
-                    else:
-                        attr_stats[attr_name]['used'] += 1
-            else:
-                # D3D: 使用语义名称匹配
-                shader_semantics = set()
-                for sig in vs_refl.inputSignature:
-                    semantic_name = getattr(sig, 'semanticName', '')
-                    semantic_index = getattr(sig, 'semanticIndex', 0)
-                    if semantic_name:
-                        shader_semantics.add("{}{}".format(semantic_name.upper(), semantic_index))
-                
-                # 获取 IA 下发的顶点输入
-                try:
-                    vertex_inputs = pipe.GetVertexInputs()
-                except:
-                    vertex_inputs = []
-                
-                if not vertex_inputs:
-                    for child in action.children:
-                        process_action(child)
-                    return
-                
-                # 检查浪费
-                wasted_attrs = []
-                wasted_bytes_per_vertex = 0
-                
-                for attr in vertex_inputs:
-                    attr_name = getattr(attr, 'name', '')
-                    # 解析语义名称和索引
-                    base_name = attr_name.rstrip('0123456789').upper()
-                    idx_str = ''
-                    for c in reversed(attr_name):
-                        if c.isdigit():
-                            idx_str = c + idx_str
-                        else:
-                            break
-                    semantic_index = int(idx_str) if idx_str else 0
-                    semantic_key = "{}{}".format(base_name, semantic_index)
-                    
-                    fmt = getattr(attr, 'format', None)
-                    byte_size = get_format_byte_size(fmt) if fmt else 4
-                    
-                    attr_stats[attr_name]['provided'] += 1
-                    
-                    if semantic_key not in shader_semantics:
-                        wasted_attrs.append({
-                            'name': attr_name,
-                            'size': byte_size
-                        })
-                        wasted_bytes_per_vertex += byte_size
-                        attr_stats[attr_name]['wasted'] += 1
-                    else:
-                        attr_stats[attr_name]['used'] += 1
-            
-            # 记录浪费情况
-            if wasted_attrs:
-                draws_with_waste += 1
-                num_vertices = getattr(action, 'numIndices', 0)
-                if num_vertices == 0:
-                    num_vertices = getattr(action, 'numVertices', 0)
-                
-                total_vertices += num_vertices
-                total_wasted_bytes += wasted_bytes_per_vertex * num_vertices
-                
-                waste_details.append({
-                    'eid': action.eventId,
-                    'num_vertices': num_vertices,
-                    'wasted_attrs': [a['name'] for a in wasted_attrs],
-                    'wasted_bytes': wasted_bytes_per_vertex * num_vertices
-                })
-        
-        for child in action.children:
-            process_action(child)
-    
-    root_actions = controller.GetRootActions()
-    for action in root_actions:
-        process_action(action)
-    
-    # 找出最常被浪费的属性
-    most_wasted = sorted(
-        [(k, v['wasted']) for k, v in attr_stats.items() if v['wasted'] > 0],
-        key=lambda x: x[1], reverse=True
-    )[:5]
-    
-    return {
-        'total_draws': total_draws,
-        'draws_with_waste': draws_with_waste,
-        'waste_ratio': draws_with_waste / total_draws * 100 if total_draws > 0 else 0,
-        'total_wasted_bytes': total_wasted_bytes,
-        'total_vertices': total_vertices,
-        'most_wasted_attrs': most_wasted,
-        'waste_details': sorted(waste_details, key=lambda x: x['wasted_bytes'], reverse=True)[:10]
-    }
-
-
-def analyze_shader_bindings(controller):
-    """Shader 资源绑定浪费分析"""
-    from collections import defaultdict
-    
-    total_draws = 0
+    # Shader 绑定统计
     draws_with_unused = 0
     unused_srv_count = 0
     unused_cbv_count = 0
     unused_uav_count = 0
     binding_details = []
     
-    def process_action(action):
-        nonlocal total_draws, draws_with_unused, unused_srv_count, unused_cbv_count, unused_uav_count
+    # 以下缓存只在预取线程中读写：反射和单阶段未使用绑定点按 (stage, shader_id)，合并结果按 (VS, FS, CS)
+    refl_cache = {}
+    binding_cache = {}
+    pipeline_cache = {}
+    # VS 实际读取的输入集合只取决于 Shader，按 VS 缓存（主线程）
+    shader_inputs_cache = {}
+    
+    def get_shader_inputs(vs_shader, vs_refl):
+        """Location 匹配时返回 location 集合，语义匹配时返回语义键集合"""
+        shader_inputs = shader_inputs_cache.get(vs_shader)
+        if shader_inputs is not None:
+            return shader_inputs
         
-        if action.flags & rd.ActionFlags.Drawcall:
-            total_draws += 1
-            
-            controller.SetFrameEvent(action.eventId, False)
-            pipe = controller.GetPipelineState()
+        shader_inputs = set()
+        if use_location_matching:
+            for sig in vs_refl.inputSignature:
+                # regIndex 对应 Vulkan 的 Location
+                loc = getattr(sig, 'regIndex', -1)
+                if loc >= 0:
+                    shader_inputs.add(loc)
+        else:
+            for sig in vs_refl.inputSignature:
+                semantic_name = getattr(sig, 'semanticName', '')
+                semantic_index = getattr(sig, 'semanticIndex', 0)
+                if semantic_name:
+                    shader_inputs.add("{}{}".format(semantic_name.upper(), semantic_index))
+        
+        shader_inputs_cache[vs_shader] = shader_inputs
+        return shader_inputs
+    
+    # 默认直接属性访问；遇到缺少字段的顶点输入后永久切换到防御性版本
+    extract_input = extract_vertex_input
+    extract_input_checked = partial(extract_vertex_input_checked,
+                                    unnamed=None if use_location_matching else '')
+    
+    def extract_inputs(vertex_inputs):
+        nonlocal extract_input
+        try:
+            return [extract_input(attr) for attr in vertex_inputs]
+        except AttributeError:
+            extract_input = extract_input_checked
+            return [extract_input(attr) for attr in vertex_inputs]
+    
+    def process_vertex_attributes(action, vs_shader, vs_refl, vertex_inputs):
+        nonlocal draws_with_waste, total_wasted_bytes, total_vertices
+        
+        if vs_refl is None:
+            return
+        
+        # 根据 API 类型选择匹配方式
+        if use_location_matching:
+            # Vulkan / OpenGL: 使用 Location 匹配
+            if not vertex_inputs:
+                return
+            shader_locations = get_shader_inputs(vs_shader, vs_refl)
             
-            draw_has_unused = False
-            draw_unused_details = {'eid': action.eventId, 'srv': [], 'cbv': [], 'uav': []}
+            # 检查浪费
+            wasted_attrs = []
+            wasted_bytes_per_vertex = 0
             
-            # 检查每个 shader 阶段
-            for stage in [rd.ShaderStage.Vertex, rd.ShaderStage.Fragment, rd.ShaderStage.Compute]:
-                shader = pipe.GetShader(stage)
-                if shader == rd.ResourceId.Null():
-                    continue
+            for attr_location, attr_name, fmt in extract_inputs(vertex_inputs):
+                byte_size = get_format_byte_size(fmt) if fmt else 4
                 
-                refl = pipe.GetShaderReflection(stage)
-                if refl is None:
-                    continue
+                attr_stats[attr_name]['provided'] += 1
                 
-                try:
-                    mapping = pipe.GetBindpointMapping(stage)
-                except:
-                    continue
+                # 检查该 location 是否被 Shader 使用
+                if attr_location >= 0 and attr_location not in shader_locations:
+                    wasted_attrs.append({
+                        'name': attr_name,
+                        'location': attr_location,
+                        'size': byte_size
+                    })
+                    wasted_bytes_per_vertex += byte_size
+                    attr_stats[attr_name]['wasted'] += 1
+                else:
+                    attr_stats[attr_name]['used'] += 1
+        else:
+            # D3D: 使用语义名称匹配
+            if not vertex_inputs:
+                return
+            shader_semantics = get_shader_inputs(vs_shader, vs_refl)
+            
+            # 检查浪费
+            wasted_attrs = []
+            wasted_bytes_per_vertex = 0
+            
+            for _, attr_name, fmt in extract_inputs(vertex_inputs):
+                # 解析语义名称和索引
+                semantic_key = parse_semantic_key(attr_name)
                 
-                # 检查只读资源 (SRV/Textures)
-                if hasattr(mapping, 'readOnlyResources'):
-                    for i, bp in enumerate(mapping.readOnlyResources):
-                        if hasattr(bp, 'used') and not bp.used:
-                            if hasattr(bp, 'bind') and bp.bind >= 0:
-                                draw_has_unused = True
-                                unused_srv_count += 1
-                                draw_unused_details['srv'].append(bp.bind)
+                byte_size = get_format_byte_size(fmt) if fmt else 4
                 
-                # 检查常量缓冲区 (CBV)
-                if hasattr(mapping, 'constantBlocks'):
-                    for i, bp in enumerate(mapping.constantBlocks):
-                        if hasattr(bp, 'used') and not bp.used:
-                            if hasattr(bp, 'bind') and bp.bind >= 0:
-                                draw_has_unused = True
-                                unused_cbv_count += 1
-                                draw_unused_details['cbv'].append(bp.bind)
+                attr_stats[attr_name]['provided'] += 1
                 
-                # 检查读写资源 (UAV)
-                if hasattr(mapping, 'readWriteResources'):
-                    for i, bp in enumerate(mapping.readWriteResources):
-                        if hasattr(bp, 'used') and not bp.used:
-                            if hasattr(bp, 'bind') and bp.bind >= 0:
-                                draw_has_unused = True
-                                unused_uav_count += 1
-                                draw_unused_details['uav'].append(bp.bind)
+                if semantic_key not in shader_semantics:
+                    wasted_attrs.append({
+                        'name': attr_name,
+                        'size': byte_size
+                    })
+                    wasted_bytes_per_vertex += byte_size
+                    attr_stats[attr_name]['wasted'] += 1
+                else:
+                    attr_stats[attr_name]['used'] += 1
+        
+        # 记录浪费情况
+        if wasted_attrs:
+            draws_with_waste += 1
+            num_vertices = getattr(action, 'numIndices', 0)
+            if num_vertices == 0:
+                num_vertices = getattr(action, 'numVertices', 0)
+            
+            total_vertices += num_vertices
+            total_wasted_bytes += wasted_bytes_per_vertex * num_vertices
             
-            if draw_has_unused:
-                draws_with_unused += 1
-                if len(binding_details) < 10:
-                    binding_details.append(draw_unused_details)
+            waste_details.append({
+                'eid': action.eventId,
+                'num_vertices': num_vertices,
+                'wasted_attrs': [a['name'] for a in wasted_attrs],
+                'wasted_bytes': wasted_bytes_per_vertex * num_vertices
+            })
+    
+    def process_shader_bindings(action, unused):
+        nonlocal draws_with_unused, unused_srv_count, unused_cbv_count, unused_uav_count
         
-        for child in action.children:
-            process_action(child)
-    
-    root_actions = controller.GetRootActions()
-    for action in root_actions:
-        process_action(action)
-    
-    return {
-        'total_draws': total_draws,
-        'draws_with_unused': draws_with_unused,
-        'unused_ratio': draws_with_unused / total_draws * 100 if total_draws > 0 else 0,
-        'unused_srv_count': unused_srv_count,
-        'unused_cbv_count': unused_cbv_count,
-        'unused_uav_count': unused_uav_count,
-        'total_unused': unused_srv_count + unused_cbv_count + unused_uav_count,
-        'binding_details': binding_details
-    }
+        srv_binds, cbv_binds, uav_binds = unused
+        if not (srv_binds or cbv_binds or uav_binds):
+            return
+        
+        unused_srv_count += len(srv_binds)
+        unused_cbv_count += len(cbv_binds)
+        unused_uav_count += len(uav_binds)
+        
+        draws_with_unused += 1
+        if len(binding_details) < 10:
+            binding_details.append({
+                'eid': action.eventId,
+                'srv': list(srv_binds),
+                'cbv': list(cbv_binds),
+                'uav': list(uav_binds),
+            })
+    
+    def fetch_draw_state(pipe):
+        vertex_state = fetch_vertex_state(pipe, refl_cache) if vertex else None
+        unused = fetch_binding_state(pipe, refl_cache, binding_cache, pipeline_cache) if bindings else None
+        return vertex_state, unused
+    
+    total_draws = len(draw_actions)
+    
+    # 处理出错时立即关闭生成器，先停下预取线程再把异常交给调用方
+    with closing(prefetch_draw_states(controller, draw_actions, fetch_draw_state)) as draw_states:
+        for action, (vertex_state, unused) in draw_states:
+            if vertex:
+                process_vertex_attributes(action, *vertex_state)
+            if bindings:
+                process_shader_bindings(action, unused)
+    
+    results = {}
+    if vertex:
+        # 找出最常被浪费的属性
+        most_wasted = sorted(
+            [(k, v['wasted']) for k, v in attr_stats.items() if v['wasted'] > 0],
+            key=lambda x: x[1], reverse=True
+        )[:5]
+        
+        results['vertex'] = {
+            'total_draws': total_draws,
+            'draws_with_waste': draws_with_waste,
+            'waste_ratio': draws_with_waste / total_draws * 100 if total_draws > 0 else 0,
+            'total_wasted_bytes': total_wasted_bytes,
+            'total_vertices': total_vertices,
+            'most_wasted_attrs': most_wasted,
+            'waste_details': sorted(waste_details, key=lambda x: x['wasted_bytes'], reverse=True)[:10]
+        }
+    
+    if bindings:
+        results['bindings'] = {
+            'total_draws': total_draws,
+            'draws_with_unused': draws_with_unused,
+            'unused_ratio': draws_with_unused / total_draws * 100 if total_draws > 0 else 0,
+            'unused_srv_count': unused_srv_count,
+            'unused_cbv_count': unused_cbv_count,
+            'unused_uav_count': unused_uav_count,
+            'total_unused': unused_srv_count + unused_cbv_count + unused_uav_count,
+            'binding_details': binding_details
+        }
+    return results
+
+
+def rate_overdraw(avg):
+    """按平均 Overdraw 倍数查表给出评级"""
+    for limit, rating in _OVERDRAW_RATINGS:
+        if avg < limit:
+            return rating
+    return _OVERDRAW_RATINGS[-1][1]
 
 
 def print_summary_report(basic_stats, memory_stats, overdraw_stats, geometry_stats, elapsed_time):
     """打印综合摘要报告"""
     
-    print("\n")
-    print("=" * 80)
-    print("               📊 RenderDoc Android 综合分析报告")
-    print("=" * 80)
-    print(f"  分析时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"  耗时: {elapsed_time:.1f} 秒")
+    # 报告先缓存到列表，最后一次性写出
+    out = []
+    w = out.append
+    
+    w("\n")
+    w("=" * 80)
+    w("               📊 RenderDoc Android 综合分析报告")
+    w("=" * 80)
+    w(f"  分析时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    w(f"  耗时: {elapsed_time:.1f} 秒")
     
     # 基础统计
-    print("\n" + "-" * 80)
-    print("  📋 基础统计")
-    print("-" * 80)
+    w("\n" + "-" * 80)
+    w("  📋 基础统计")
+    w("-" * 80)
     if basic_stats:
-        print(f"    Drawcall 总数:        {basic_stats['total_draws']:,}")
-        print(f"    Dispatch 总数:        {basic_stats['total_dispatches']:,}")
-        print(f"    Pass 数量:            {basic_stats['pass_count']}")
-        print(f"    纹理数量:             {basic_stats['texture_count']}")
-        print(f"    Buffer 数量:          {basic_stats['buffer_count']}")
+        w(f"    Drawcall 总数:        {basic_stats['total_draws']:,}")
+        w(f"    Dispatch 总数:        {basic_stats['total_dispatches']:,}")
+        w(f"    Pass 数量:            {basic_stats['pass_count']}")
+        w(f"    纹理数量:             {basic_stats['texture_count']}")
+        w(f"    Buffer 数量:          {basic_stats['buffer_count']}")
     else:
-        print("    ⚠️ 基础统计分析跳过或失败")
+        w("    ⚠️ 基础统计分析跳过或失败")
     
     # 内存统计
-    print("\n" + "-" * 80)
-    print("  💾 GPU 内存")
-    print("-" * 80)
+    w("\n" + "-" * 80)
+    w("  💾 GPU 内存")
+    w("-" * 80)
     if memory_stats:
-        print(f"    总内存:               {format_size(memory_stats['total_memory'])}")
-        print(f"    ├─ 纹理内存:          {format_size(memory_stats['texture_memory'])}")
-        print(f"    └─ Buffer 内存:       {format_size(memory_stats['buffer_memory'])}")
+        w(f"    总内存:               {format_size(memory_stats['total_memory'])}")
+        w(f"    ├─ 纹理内存:          {format_size(memory_stats['texture_memory'])}")
+        w(f"    └─ Buffer 内存:       {format_size(memory_stats['buffer_memory'])}")
     else:
-        print("    ⚠️ 内存分析跳过或失败")
+        w("    ⚠️ 内存分析跳过或失败")
     
     # Overdraw 统计
-    print("\n" + "-" * 80)
-    print("  🎨 Overdraw")
-    print("-" * 80)
+    w("\n" + "-" * 80)
+    w("  🎨 Overdraw")
+    w("-" * 80)
     if overdraw_stats:
-        print(f"    屏幕分辨率:           {overdraw_stats['screen_resolution']}")
-        print(f"    平均 Overdraw:        {overdraw_stats['avg_overdraw']:.2f}x")
+        w(f"    屏幕分辨率:           {overdraw_stats['screen_resolution']}")
+        w(f"    平均 Overdraw:        {overdraw_stats['avg_overdraw']:.2f}x")
         
         # 评级
-        avg = overdraw_stats['avg_overdraw']
-        if avg < 2:
-            rating = "✅ 优秀"
-        elif avg < 3:
-            rating = "👍 良好"
-        elif avg < 5:
-            rating = "⚠️ 一般"
-        else:
-            rating = "❌ 较差"
-        print(f"    评级:                 {rating}")
+        w(f"    评级:                 {rate_overdraw(overdraw_stats['avg_overdraw'])}")
     else:
-        print("    ⚠️ Overdraw 分析跳过或失败")
+        w("    ⚠️ Overdraw 分析跳过或失败")
     
     # 几何统计
-    print("\n" + "-" * 80)
-    print("  📐 几何复杂度")
-    print("-" * 80)
+    w("\n" + "-" * 80)
+    w("  📐 几何复杂度")
+    w("-" * 80)
     if geometry_stats:
-        print(f"    总三角形数:           {format_number(geometry_stats['total_triangles'])}")
-        print(f"    总实例数:             {geometry_stats['total_instances']:,}")
-        print(f"    平均每 Draw 三角形:   {format_number(geometry_stats['avg_triangles_per_draw'])}")
+        w(f"    总三角形数:           {format_number(geometry_stats['total_triangles'])}")
+        w(f"    总实例数:             {geometry_stats['total_instances']:,}")
+        w(f"    平均每 Draw 三角形:   {format_number(geometry_stats['avg_triangles_per_draw'])}")
     else:
-        print("    ⚠️ 几何分析跳过或失败")
+        w("    ⚠️ 几何分析跳过或失败")
     
     # 优化建议
-    print("\n" + "=" * 80)
-    print("  💡 优化建议")
-    print("=" * 80)
+    w("\n" + "=" * 80)
+    w("  💡 优化建议")
+    w("=" * 80)
     
     suggestions = []
     
@@ -771,149 +898,147 @@ def print_summary_report(basic_stats, memory_stats, overdraw_stats, geometry_sta
         suggestions.append(f"  • Drawcall 较多 ({basic_stats['total_draws']})，考虑批处理合并")
     
     if not suggestions:
-        print("  ✅ 整体性能良好，没有明显问题")
+        w("  ✅ 整体性能良好，没有明显问题")
     else:
         for s in suggestions:
-            print(s)
+            w(s)
+    
+    w("\n" + "=" * 80)
     
-    print("\n" + "=" * 80)
+    sys.stdout.write("\n".join(out) + "\n")
+    sys.stdout.flush()
 
 
 def print_full_report(basic_stats, memory_stats, overdraw_stats, geometry_stats, 
                       vertex_attrs_stats, shader_bindings_stats, elapsed_time):
     """打印完整综合报告"""
     
-    print("\n")
-    print("=" * 80)
-    print("               📊 RenderDoc Android 综合分析报告")
-    print("=" * 80)
-    print("  分析时间: {}".format(datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
-    print("  耗时: {:.1f} 秒".format(elapsed_time))
+    # 报告先缓存到列表，最后一次性写出
+    out = []
+    w = out.append
+    
+    w("\n")
+    w("=" * 80)
+    w("               📊 RenderDoc Android 综合分析报告")
+    w("=" * 80)
+    w("  分析时间: {}".format(datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+    w("  耗时: {:.1f} 秒".format(elapsed_time))
     
     # 基础统计
-    print("\n" + "-" * 80)
-    print("  📋 基础统计")
-    print("-" * 80)
+    w("\n" + "-" * 80)
+    w("  📋 基础统计")
+    w("-" * 80)
     if basic_stats:
-        print("    Drawcall 总数:        {:,}".format(basic_stats['total_draws']))
-        print("    Dispatch 总数:        {:,}".format(basic_stats['total_dispatches']))
-        print("    Pass 数量:            {}".format(basic_stats['pass_count']))
-        print("    纹理数量:             {}".format(basic_stats['texture_count']))
-        print("    Buffer 数量:          {}".format(basic_stats['buffer_count']))
+        w("    Drawcall 总数:        {:,}".format(basic_stats['total_draws']))
+        w("    Dispatch 总数:        {:,}".format(basic_stats['total_dispatches']))
+        w("    Pass 数量:            {}".format(basic_stats['pass_count']))
+        w("    纹理数量:             {}".format(basic_stats['texture_count']))
+        w("    Buffer 数量:          {}".format(basic_stats['buffer_count']))
     else:
-        print("    ⚠️ 基础统计分析跳过或失败")
+        w("    ⚠️ 基础统计分析跳过或失败")
     
     # 内存统计
-    print("\n" + "-" * 80)
-    print("  💾 GPU 内存")
-    print("-" * 80)
+    w("\n" + "-" * 80)
+    w("  💾 GPU 内存")
+    w("-" * 80)
     if memory_stats:
-        print("    总内存:               {}".format(format_size(memory_stats['total_memory'])))
-        print("    ├─ 纹理内存:          {}".format(format_size(memory_stats['texture_memory'])))
-        print("    └─ Buffer 内存:       {}".format(format_size(memory_stats['buffer_memory'])))
+        w("    总内存:               {}".format(format_size(memory_stats['total_memory'])))
+        w("    ├─ 纹理内存:          {}".format(format_size(memory_stats['texture_memory'])))
+        w("    └─ Buffer 内存:       {}".format(format_size(memory_stats['buffer_memory'])))
     else:
-        print("    ⚠️ 内存分析跳过或失败")
+        w("    ⚠️ 内存分析跳过或失败")
     
     # Overdraw 统计
-    print("\n" + "-" * 80)
-    print("  🎨 Overdraw (启发式估算)")
-    print("-" * 80)
+    w("\n" + "-" * 80)
+    w("  🎨 Overdraw (启发式估算)")
+    w("-" * 80)
     if overdraw_stats:
-        print("    屏幕分辨率:           {}".format(overdraw_stats['screen_resolution']))
-        print("    平均 Overdraw:        {:.2f}x".format(overdraw_stats['avg_overdraw']))
+        w("    屏幕分辨率:           {}".format(overdraw_stats['screen_resolution']))
+        w("    平均 Overdraw:        {:.2f}x".format(overdraw_stats['avg_overdraw']))
         
-        avg = overdraw_stats['avg_overdraw']
-        if avg < 2:
-            rating = "✅ 优秀"
-        elif avg < 3:
-            rating = "👍 良好"
-        elif avg < 5:
-            rating = "⚠️ 一般"
-        else:
-            rating = "❌ 较差"
-        print("    评级:                 {}".format(rating))
+        w("    评级:                 {}".format(rate_overdraw(overdraw_stats['avg_overdraw'])))
     else:
-        print("    ⚠️ Overdraw 分析跳过或失败")
+        w("    ⚠️ Overdraw 分析跳过或失败")
     
     # 几何统计
-    print("\n" + "-" * 80)
-    print("  📐 几何复杂度")
-    print("-" * 80)
+    w("\n" + "-" * 80)
+    w("  📐 几何复杂度")
+    w("-" * 80)
     if geometry_stats:
-        print("    总三角形数:           {}".format(format_number(geometry_stats['total_triangles'])))
-        print("    总实例数:             {:,}".format(geometry_stats['total_instances']))
-        print("    平均每 Draw 三角形:   {}".format(format_number(geometry_stats['avg_triangles_per_draw'])))
+        w("    总三角形数:           {}".format(format_number(geometry_stats['total_triangles'])))
+        w("    总实例数:             {:,}".format(geometry_stats['total_instances']))
+        w("    平均每 Draw 三角形:   {}".format(format_number(geometry_stats['avg_triangles_per_draw'])))
     else:
-        print("    ⚠️ 几何分析跳过或失败")
+        w("    ⚠️ 几何分析跳过或失败")
     
     # 顶点属性浪费
-    print("\n" + "-" * 80)
-    print("  🔺 顶点属性浪费")
-    print("-" * 80)
+    w("\n" + "-" * 80)
+    w("  🔺 顶点属性浪费")
+    w("-" * 80)
     if vertex_attrs_stats:
-        print("    总 Draw 调用:         {:,}".format(vertex_attrs_stats['total_draws']))
-        print("    存在浪费的 Draw:      {:,} ({:.1f}%)".format(
+        w("    总 Draw 调用:         {:,}".format(vertex_attrs_stats['total_draws']))
+        w("    存在浪费的 Draw:      {:,} ({:.1f}%)".format(
             vertex_attrs_stats['draws_with_waste'],
             vertex_attrs_stats['waste_ratio']))
-        print("    浪费的带宽:           {}".format(format_size(vertex_attrs_stats['total_wasted_bytes'])))
+        w("    浪费的带宽:           {}".format(format_size(vertex_attrs_stats['total_wasted_bytes'])))
         
         if vertex_attrs_stats['most_wasted_attrs']:
             attrs_str = ", ".join(["{}({}次)".format(n, c) for n, c in vertex_attrs_stats['most_wasted_attrs']])
-            print("    最常浪费属性:         {}".format(attrs_str))
+            w("    最常浪费属性:         {}".format(attrs_str))
         
         if vertex_attrs_stats['waste_ratio'] > 20:
-            print("    评级:                 ❌ 较差 - 大量顶点属性被浪费")
+            w("    评级:                 ❌ 较差 - 大量顶点属性被浪费")
         elif vertex_attrs_stats['waste_ratio'] > 5:
-            print("    评级:                 ⚠️ 一般 - 存在顶点属性浪费")
+            w("    评级:                 ⚠️ 一般 - 存在顶点属性浪费")
         else:
-            print("    评级:                 ✅ 良好")
+            w("    评级:                 ✅ 良好")
         
         # 打印 Top 10 浪费最多的 Draw Call
         if vertex_attrs_stats.get('waste_details'):
-            print("\n    📋 顶点属性浪费 Top 10 Draw Calls:")
-            print("    " + "-" * 70)
-            print("    {:>8}  {:>12}  {:>14}  {}".format("EID", "顶点数", "浪费带宽", "浪费属性"))
-            print("    " + "-" * 70)
+            w("\n    📋 顶点属性浪费 Top 10 Draw Calls:")
+            w("    " + "-" * 70)
+            w("    {:>8}  {:>12}  {:>14}  {}".format("EID", "顶点数", "浪费带宽", "浪费属性"))
+            w("    " + "-" * 70)
             for detail in vertex_attrs_stats['waste_details'][:10]:
                 attrs = ", ".join(detail['wasted_attrs'][:5])
                 if len(detail['wasted_attrs']) > 5:
                     attrs += "..."
-                print("    {:>8}  {:>12,}  {:>14}  {}".format(
+                w("    {:>8}  {:>12,}  {:>14}  {}".format(
                     detail['eid'],
                     detail['num_vertices'],
                     format_size(detail['wasted_bytes']),
                     attrs
                 ))
-            print("    " + "-" * 70)
+            w("    " + "-" * 70)
     else:
-        print("    ⚠️ 顶点属性分析跳过或失败")
+        w("    ⚠️ 顶点属性分析跳过或失败")
     
     # Shader 资源绑定浪费
-    print("\n" + "-" * 80)
-    print("  🎯 Shader 资源绑定")
-    print("-" * 80)
+    w("\n" + "-" * 80)
+    w("  🎯 Shader 资源绑定")
+    w("-" * 80)
     if shader_bindings_stats:
-        print("    总 Draw 调用:         {:,}".format(shader_bindings_stats['total_draws']))
-        print("    存在未使用绑定的 Draw: {:,} ({:.1f}%)".format(
+        w("    总 Draw 调用:         {:,}".format(shader_bindings_stats['total_draws']))
+        w("    存在未使用绑定的 Draw: {:,} ({:.1f}%)".format(
             shader_bindings_stats['draws_with_unused'],
             shader_bindings_stats['unused_ratio']))
-        print("    未使用 SRV/纹理:      {}".format(shader_bindings_stats['unused_srv_count']))
-        print("    未使用 CBV/常量:      {}".format(shader_bindings_stats['unused_cbv_count']))
-        print("    未使用 UAV:           {}".format(shader_bindings_stats['unused_uav_count']))
+        w("    未使用 SRV/纹理:      {}".format(shader_bindings_stats['unused_srv_count']))
+        w("    未使用 CBV/常量:      {}".format(shader_bindings_stats['unused_cbv_count']))
+        w("    未使用 UAV:           {}".format(shader_bindings_stats['unused_uav_count']))
         
         if shader_bindings_stats['unused_ratio'] > 30:
-            print("    评级:                 ❌ 较差 - 大量资源绑定被浪费")
+            w("    评级:                 ❌ 较差 - 大量资源绑定被浪费")
         elif shader_bindings_stats['unused_ratio'] > 10:
-            print("    评级:                 ⚠️ 一般 - 存在资源绑定浪费")
+            w("    评级:                 ⚠️ 一般 - 存在资源绑定浪费")
         else:
-            print("    评级:                 ✅ 良好")
+            w("    评级:                 ✅ 良好")
     else:
-        print("    ⚠️ Shader 绑定分析跳过或失败")
+        w("    ⚠️ Shader 绑定分析跳过或失败")
     
     # 优化建议
-    print("\n" + "=" * 80)
-    print("  💡 优化建议")
-    print("=" * 80)
+    w("\n" + "=" * 80)
+    w("  💡 优化建议")
+    w("=" * 80)
     
     suggestions = []
     
@@ -936,12 +1061,15 @@ def print_full_report(basic_stats, memory_stats, overdraw_stats, geometry_stats,
         suggestions.append("  • 资源绑定浪费较多 ({:.1f}%)，考虑优化材质变体".format(shader_bindings_stats['unused_ratio']))
     
     if not suggestions:
-        print("  ✅ 整体性能良好，没有明显问题")
+        w("  ✅ 整体性能良好，没有明显问题")
     else:
         for s in suggestions:
-            print(s)
+            w(s)
+    
+    w("\n" + "=" * 80)
     
-    print("\n" + "=" * 80)
+    sys.stdout.write("\n".join(out) + "\n")
+    sys.stdout.flush()
 
 
 def main():
@@ -1001,10 +1129,24 @@ def main():
     shader_bindings_stats = None
     
     try:
-        if run_all or args.basic:
-            print("\n📋 执行基础统计分析...", flush=True)
+        run_basic = run_all or args.basic
+        run_overdraw = run_all or args.overdraw
+        run_geometry = run_all or args.geometry
+        run_vertex_attrs = run_all or args.vertex_attrs
+        run_shader_bindings = run_all or args.shader_bindings
+        
+        # Action 树只获取并展平一次，之后的分析都使用展平后的列表
+        actions = None
+        if run_basic or run_overdraw or run_geometry or run_vertex_attrs or run_shader_bindings:
+            actions = collect_actions(controller.GetRootActions())
+        
+        if run_basic or run_overdraw or run_geometry:
+            print("\n📋 执行基础统计 / Overdraw / 几何复杂度分析...", flush=True)
             try:
-                basic_stats = analyze_basic_stats(controller)
+                results = analyze_all(controller, actions, basic=run_basic, overdraw=run_overdraw, geometry=run_geometry)
+                basic_stats = results.get('basic')
+                overdraw_stats = results.get('overdraw')
+                geometry_stats = results.get('geometry')
                 print("   ✅ 完成")
             except Exception as e:
                 print("   ❌ 失败: {}".format(e))
@@ -1017,36 +1159,12 @@ def main():
             except Exception as e:
                 print("   ❌ 失败: {}".format(e))
         
-        if run_all or args.overdraw:
-            print("\n🎨 执行 Overdraw 分析...", flush=True)
-            try:
-                overdraw_stats = analyze_overdraw(controller)
-                print("   ✅ 完成")
-            except Exception as e:
-                print("   ❌ 失败: {}".format(e))
-        
-        if run_all or args.geometry:
-            print("\n📐 执行几何复杂度分析...", flush=True)
-            try:
-                geometry_stats = analyze_geometry(controller)
-                print("   ✅ 完成")
-            except Exception as e:
-                print("   ❌ 失败: {}".format(e))
-        
-        if run_all or args.vertex_attrs:
-            print("\n🔺 执行顶点属性浪费分析...", flush=True)
-            try:
-                vertex_attrs_stats = analyze_vertex_attributes(controller)
-                print("   ✅ 完成")
-            except Exception as e:
-                print("   ❌ 失败: {}".format(e))
-                import traceback
-                traceback.print_exc()
-        
-        if run_all or args.shader_bindings:
-            print("\n🎯 执行 Shader 资源绑定分析...", flush=True)
+        if run_vertex_attrs or run_shader_bindings:
+            print("\n🔺 执行顶点属性 / Shader 资源绑定分析...", flush=True)
             try:
-                shader_bindings_stats = analyze_shader_bindings(controller)
+                results = analyze_per_draw(controller, actions.draws, vertex=run_vertex_attrs, bindings=run_shader_bindings)
+                vertex_attrs_stats = results.get('vertex')
+                shader_bindings_stats = results.get('bindings')
                 print("   ✅ 完成")
             except Exception as e:
                 print("   ❌ 失败: {}".format(e))
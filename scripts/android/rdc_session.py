@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+RenderDoc Android 远程会话公共模块
+
+封装 ADB 端口转发、远程服务器连接和远程捕获打开，供各 Android 分析脚本共用。
+多个分析在同一进程内运行时，可以只打开一次捕获并共享同一个 ReplayController:
+
+    with RdcSession(rdc_path) as controller:
+        if controller is None:
+            sys.exit(1)
+        analyze_memory_remote(controller)
+        analyze_geometry_remote(controller)
+"""
+
+import sys
+import os
+import importlib.util
+import threading
+
+# 自动添加 RenderDoc Python 模块路径（renderdoc 已可导入时不探测目录、不修改 sys.path）
+RENDERDOC_MODULE_PATHS = [
+    r"E:\code build\renderdoc-1.x\renderdoc-1.x\x64\Development\pymodules",
+    r"E:\code build\RenderDoc_1.37_64",
+    r"C:\Program Files\RenderDoc",
+]
+if importlib.util.find_spec('renderdoc') is None:
+    for path in RENDERDOC_MODULE_PATHS:
+        if os.path.isdir(path):
+            sys.path.insert(0, path)
+            break
+
+import renderdoc as rd
+
+# 默认远程服务器配置
+DEFAULT_HOST = "localhost"
+DEFAULT_PORT = 38920
+
+
+def setup_adb_port_forward():
+    """设置 ADB 端口转发"""
+    import subprocess
+    try:
+        result = subprocess.run(
+            ["adb", "forward", f"tcp:{DEFAULT_PORT}", f"tcp:{DEFAULT_PORT}"],
+            capture_output=True,
+            text=True
+        )
+        if result.returncode == 0:
+            print(f"✅ ADB 端口转发设置成功: tcp:{DEFAULT_PORT}")
+            return True
+        else:
+            print(f"⚠️ ADB 端口转发失败: {result.stderr}")
+            return False
+    except FileNotFoundError:
+        print("⚠️ 未找到 adb 命令，请确保已安装 Android SDK 并配置环境变量")
+        return False
+
+
+def connect_to_remote_server(host, port):
+    """连接到远程 RenderDoc 服务器"""
+    print(f"\n正在连接远程服务器 {host}:{port}...")
+    
+    try:
+        result, remote = rd.CreateRemoteServerConnection(host, port, None)
+        
+        if result != rd.ResultCode.Succeeded:
+            print(f"❌ 连接失败: {result}")
+            print("\n可能的原因:")
+            print("  1. Android 上的 RenderDoc Replay Server 未启动")
+            print("  2. ADB 端口转发未设置: adb forward tcp:38920 tcp:38920")
+            print("  3. 设备不在同一网络或端口被防火墙阻止")
+            return None
+        
+        print(f"✅ 成功连接到远程服务器")
+        home_path = remote.HomeFolder()
+        print(f"   远程设备目录: {home_path}")
+        
+        return remote
+        
+    except Exception as e:
+        print(f"❌ 连接异常: {e}")
+        return None
+
+
+def open_remote_capture(remote, rdc_path):
+    """在远程设备上打开 RDC 文件"""
+    print(f"\n正在打开远程 RDC 文件: {rdc_path}")
+    
+    try:
+        local_progress = None
+        result, path_or_error = remote.CopyCaptureToRemote(rdc_path, local_progress)
+        
+        if result != rd.ResultCode.Succeeded:
+            print(f"   文件复制跳过，尝试直接打开...")
+            remote_path = rdc_path
+        else:
+            remote_path = path_or_error
+            print(f"   文件已复制到远程: {remote_path}")
+        
+        result, controller = remote.OpenCapture(0, remote_path, rd.ReplayOptions(), None)
+        
+        if result != rd.ResultCode.Succeeded:
+            print(f"❌ 无法打开捕获文件: {result}")
+            return None
+        
+        print(f"✅ 成功打开捕获文件")
+        return controller
+        
+    except Exception as e:
+        print(f"❌ 打开捕获文件异常: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+
+class RdcSession:
+    """远程捕获会话
+
+    进入时依次完成端口转发、连接远程服务器、打开捕获，返回 ReplayController
+    （任一步失败返回 None）；退出时关闭已打开的 controller 和远程连接。
+    """
+    
+    def __init__(self, rdc_path, host=DEFAULT_HOST, port=DEFAULT_PORT, forward=True):
+        self.rdc_path = rdc_path
+        self.host = host
+        self.port = port
+        self.forward = forward
+        self.remote = None
+        self.controller = None
+    
+    def __enter__(self):
+        if self.forward and self.host == "localhost":
+            setup_adb_port_forward()
+        
+        self.remote = connect_to_remote_server(self.host, self.port)
+        if self.remote is None:
+            return None
+        
+        self.controller = open_remote_capture(self.remote, self.rdc_path)
+        return self.controller
+    
+    def __exit__(self, exc_type, exc_value, tb):
+        if self.controller is not None:
+            self.controller.Shutdown()
+            self.controller = None
+        if self.remote is not None:
+            self.remote.Shutdown()
+            self.remote = None
+        return False
+
+
+class SerializedController:
+    """让多个线程共享同一个 ReplayController
+
+    ReplayController 不是线程安全的，这里把对 controller 的每次方法调用都放在
+    同一把锁内串行执行。只保护 controller 自身的方法；SetFrameEvent 之后再取
+    PipeState 这类多步操作不是原子的，只适合不依赖当前事件的分析并行运行。
+    """
+    
+    def __init__(self, controller):
+        self._controller = controller
+        self._lock = threading.Lock()
+    
+    def __getattr__(self, name):
+        attr = getattr(self._controller, name)
+        if not callable(attr):
+            return attr
+        
+        lock = self._lock
+        
+        def locked_call(*args, **kwargs):
+            with lock:
+                return attr(*args, **kwargs)
+        
+        return locked_call